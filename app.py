@@ -7,7 +7,10 @@ from dotenv import load_dotenv
 from backend.database import db
 from backend.auth import auth_bp
 from backend.api import api_bp
+from backend.imports import import_bp
 from backend.scheduler import scheduler_bp
+from backend.sync import sync_bp
+from backend.timetable import timetable_bp
 from backend import models # Import models to ensure they are registered
 
 load_dotenv()
@@ -36,7 +39,10 @@ migrate = Migrate(app, db)
 # Register Blueprints
 app.register_blueprint(auth_bp, url_prefix='/api')
 app.register_blueprint(api_bp, url_prefix='/api')
+app.register_blueprint(import_bp, url_prefix='/api')
 app.register_blueprint(scheduler_bp, url_prefix='/api')
+app.register_blueprint(sync_bp, url_prefix='/api')
+app.register_blueprint(timetable_bp, url_prefix='/api')
 
 @app.route('/')
 def index():
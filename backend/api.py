@@ -1,10 +1,14 @@
 
 from flask import Blueprint, request, jsonify
 from backend.database import db, time_converter
+from backend.eligibility import DAYS, YEAR_GROUPS
 from backend.models import (
     Reminder, Faculty, Subject, Branch, Section, Class, 
     Location, TimeSlot, ClassSubject, faculty_subjects
 )
+from backend.list_cache import cached_list
+from backend.listing import ListSpec, list_rows
+from sqlalchemy import case, func
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 import datetime as dt
@@ -12,18 +16,16 @@ import datetime as dt
 api_bp = Blueprint('api', __name__)
 
 # --- REMINDERS ---
+REMINDER_LIST = ListSpec(
+    Reminder,
+    {'id': Reminder.id, 'text': Reminder.text, 'reminder_datetime': Reminder.reminder_datetime},
+    order=(Reminder.reminder_datetime, Reminder.id)
+)
+
 @api_bp.route('/reminders', methods=['GET'])
+@cached_list('reminders')
 def get_reminders():
-    try:
-        reminders = Reminder.query.order_by(Reminder.reminder_datetime.asc()).all()
-        return jsonify([{
-            'id': r.id, 
-            'text': r.text, 
-            'reminder_datetime': r.reminder_datetime.isoformat() if r.reminder_datetime else None
-        } for r in reminders]), 200
-    except Exception as e:
-        print(f"Error fetching reminders: {e}")
-        return jsonify({'error': 'An internal server error occurred'}), 500
+    return list_rows(REMINDER_LIST)
 
 @api_bp.route('/reminders', methods=['POST'])
 def add_reminder():
@@ -90,18 +92,17 @@ def add_faculty():
         print(f"Error adding faculty: {e}")
         return jsonify({'error': 'An internal server error occurred'}), 500
 
+FACULTY_LIST = ListSpec(
+    Faculty,
+    {'faculty_id': Faculty.faculty_id, 'name': Faculty.name, 'faculty_code': Faculty.faculty_code},
+    order=(Faculty.name, Faculty.faculty_id),
+    filters={'faculty_code': Faculty.faculty_code}
+)
+
 @api_bp.route('/faculties', methods=['GET'])
+@cached_list('faculties')
 def get_faculties():
-    try:
-        faculties = Faculty.query.order_by(Faculty.name).all()
-        return jsonify([{
-            'faculty_id': f.faculty_id,
-            'name': f.name,
-            'faculty_code': f.faculty_code
-        } for f in faculties]), 200
-    except Exception as e:
-        print(f"Error fetching faculties: {e}")
-        return jsonify({'error': 'An internal server error occurred'}), 500
+    return list_rows(FACULTY_LIST)
 
 # --- SUBJECTS ---
 @api_bp.route('/subjects', methods=['POST'])
@@ -131,19 +132,17 @@ def add_subject():
         print(f"Error adding subject: {e}")
         return jsonify({'error': 'An internal server error occurred'}), 500
 
+SUBJECT_LIST = ListSpec(
+    Subject,
+    {'subject_id': Subject.subject_id, 'code': Subject.code, 'name': Subject.name, 'is_lab': Subject.is_lab},
+    order=(Subject.code, Subject.subject_id),
+    filters={'is_lab': Subject.is_lab}
+)
+
 @api_bp.route('/subjects', methods=['GET'])
+@cached_list('subjects')
 def get_subjects():
-    try:
-        subjects = Subject.query.order_by(Subject.code).all()
-        return jsonify([{
-            'subject_id': s.subject_id,
-            'code': s.code,
-            'name': s.name,
-            'is_lab': s.is_lab
-        } for s in subjects]), 200
-    except Exception as e:
-        print(f"Error fetching subjects: {e}")
-        return jsonify({'error': 'An internal server error occurred'}), 500
+    return list_rows(SUBJECT_LIST)
 
 # --- MAPPINGS (Faculty-Subject) ---
 @api_bp.route('/faculty-subjects', methods=['POST'])
@@ -243,17 +242,16 @@ def add_branch():
         print(f"Error adding branch: {e}")
         return jsonify({'error': 'An internal server error occurred'}), 500
 
+BRANCH_LIST = ListSpec(
+    Branch,
+    {'branch_id': Branch.branch_id, 'name': Branch.name, 'code': Branch.code},
+    order=(Branch.name, Branch.branch_id)
+)
+
 @api_bp.route('/branches', methods=['GET'])
+@cached_list('branches')
 def get_branches():
-    try:
-        branches = Branch.query.order_by(Branch.name).all()
-        return jsonify([{
-            'branch_id': b.branch_id,
-            'name': b.name,
-            'code': b.code
-        } for b in branches]), 200
-    except Exception as e:
-        return jsonify({'error': 'An internal server error occurred'}), 500
+    return list_rows(BRANCH_LIST)
 
 # --- SECTIONS ---
 @api_bp.route('/sections', methods=['POST'])
@@ -274,13 +272,16 @@ def add_section():
         db.session.rollback()
         return jsonify({'error': 'An internal server error occurred'}), 500
 
+SECTION_LIST = ListSpec(
+    Section,
+    {'section_id': Section.section_id, 'name': Section.name},
+    order=(Section.name, Section.section_id)
+)
+
 @api_bp.route('/sections', methods=['GET'])
+@cached_list('sections')
 def get_sections():
-    try:
-        sections = Section.query.order_by(Section.name).all()
-        return jsonify([{'section_id': s.section_id, 'name': s.name} for s in sections]), 200
-    except Exception:
-        return jsonify({'error': 'An internal server error occurred'}), 500
+    return list_rows(SECTION_LIST)
 
 # --- CLASSES ---
 @api_bp.route('/classes', methods=['POST'])
@@ -329,22 +330,26 @@ def add_class():
         print(f"Error adding class: {e}")
         return jsonify({'error': 'An internal server error occurred'}), 500
 
+CLASS_LIST = ListSpec(
+    Class,
+    {
+        'class_id': Class.class_id,
+        'class_name': Class.class_name,
+        'branch_id': Class.branch_id,
+        'section_id': Class.section_id,
+        'branch_name': Branch.name,
+        'section_name': Section.name,
+        'year': Class.year
+    },
+    order=(Branch.name, Class.year, Section.name, Class.class_id),
+    filters={'branch_id': Class.branch_id, 'section_id': Class.section_id, 'year': Class.year},
+    joins=((Branch, Branch.branch_id == Class.branch_id), (Section, Section.section_id == Class.section_id))
+)
+
 @api_bp.route('/classes', methods=['GET'])
+@cached_list('classes')
 def get_classes():
-    try:
-        classes = Class.query.join(Branch).join(Section).order_by(Branch.name, Class.year, Section.name).all()
-        return jsonify([{
-            'class_id': c.class_id,
-            'class_name': c.class_name,
-            'branch_id': c.branch_id,
-            'section_id': c.section_id,
-            'branch_name': c.branch.name,
-            'section_name': c.section.name,
-            'year': c.year
-        } for c in classes]), 200
-    except Exception as e:
-        print(f"Error: {e}")
-        return jsonify({'error': 'An internal server error occurred'}), 500
+    return list_rows(CLASS_LIST)
 
 # --- CLASS SUBJECTS ---
 @api_bp.route('/class-subjects/<int:class_id>', methods=['GET'])
@@ -405,17 +410,19 @@ def add_location():
         db.session.rollback()
         return jsonify({'error': 'Error'}), 500
 
+LOCATION_LIST = ListSpec(
+    Location,
+    {'location_id': Location.location_id, 'room_no': Location.room_no,
+     'building': Location.building, 'is_lab': Location.is_lab},
+    # building is optional; coalesce keeps the keyset comparison NULL-free.
+    order=(func.coalesce(Location.building, ''), Location.room_no, Location.location_id),
+    filters={'building': Location.building, 'is_lab': Location.is_lab}
+)
+
 @api_bp.route('/locations', methods=['GET'])
+@cached_list('locations')
 def get_locations():
-    try:
-        locs = Location.query.order_by(Location.building, Location.room_no).all()
-        return jsonify([{
-            'location_id': l.location_id,
-            'room_no': l.room_no,
-            'building': l.building,
-            'is_lab': l.is_lab
-        } for l in locs]), 200
-    except Exception: return jsonify({'error': 'Error'}), 500
+    return list_rows(LOCATION_LIST)
 
 # --- TIMESLOTS ---
 @api_bp.route('/timeslots', methods=['POST'])
@@ -429,6 +436,8 @@ def add_timeslot():
 
     if not all([day, period, start, end, year_group]):
          return jsonify({'error': 'All fields required'}), 400
+    if year_group not in YEAR_GROUPS:
+        return jsonify({'error': f'applicable_year_group must be one of: {", ".join(YEAR_GROUPS)}'}), 400
 
     try:
         # Values validation usually done here, skipping for brevity as types handle some
@@ -457,25 +466,23 @@ def add_timeslot():
         print(e)
         return jsonify({'error': 'Error'}), 500
 
+TIMESLOT_LIST = ListSpec(
+    TimeSlot,
+    {
+        'slot_id': TimeSlot.slot_id,
+        'day_of_week': TimeSlot.day_of_week,
+        'period_number': TimeSlot.period_number,
+        'start_time': TimeSlot.start_time,
+        'end_time': TimeSlot.end_time,
+        'applicable_year_group': TimeSlot.applicable_year_group
+    },
+    # Weekday order, not alphabetical.
+    order=(case({day: i for i, day in enumerate(DAYS)}, value=TimeSlot.day_of_week, else_=len(DAYS)),
+           TimeSlot.period_number, TimeSlot.slot_id),
+    filters={'day_of_week': TimeSlot.day_of_week, 'applicable_year_group': TimeSlot.applicable_year_group}
+)
+
 @api_bp.route('/timeslots', methods=['GET'])
+@cached_list('timeslots')
 def get_timeslots():
-    try:
-        # SQLA doesn't inherently sort ENUM strings perfectly like 'Monday', 'Tuesday'
-        # unless mapped to ints or using custom CASE/ORDER logic.
-        # For simplicity we might just fetch and sort in python, or rely on insert order for now.
-        slots = TimeSlot.query.all()
-        # Custom sort helper
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        slots.sort(key=lambda x: (days.index(x.day_of_week) if x.day_of_week in days else 99, x.period_number))
-        
-        return jsonify([{
-            'slot_id': s.slot_id,
-            'day_of_week': s.day_of_week,
-            'period_number': s.period_number,
-            'start_time': time_converter(s.start_time),
-            'end_time': time_converter(s.end_time),
-            'applicable_year_group': s.applicable_year_group
-        } for s in slots]), 200
-    except Exception as e:
-        print(e)
-        return jsonify({'error': 'Error'}), 500
+    return list_rows(TIMESLOT_LIST)
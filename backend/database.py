@@ -1,4 +1,23 @@
-
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
+
+# Spellings of booleans accepted in query strings, CSV cells and JSON.
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', ''}
+
+def time_converter(t):
+    """Formats a datetime.time as 'HH:MM' for JSON responses."""
+    return t.strftime('%H:%M') if t else None
+
+def parse_bool(value):
+    """A boolean from a bool or one of TRUE_VALUES / FALSE_VALUES (any case).
+    Raises ValueError for anything else."""
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f'not a boolean: {value}')
@@ -0,0 +1,83 @@
+# Year-group codes a timeslot may carry, each with the class years it admits.
+YEAR_GROUPS = {
+    'ALL': lambda year: True,
+    '1': lambda year: year == 1,
+    '2-3+': lambda year: year >= 2,
+}
+# Day names a timeslot may carry, in week order.
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+def day_order(day):
+    """Sort key putting days in week order and unknown names last."""
+    return DAYS.index(day) if day in DAYS else len(DAYS)
+
+def year_group_admits(group, year):
+    """Whether a class of the given year may use a slot of this year group.
+    Codes outside YEAR_GROUPS do not restrict the slot."""
+    rule = YEAR_GROUPS.get(group)
+    return rule is None or rule(year)
+
+# Slot rules, keyed by the unit attribute they look at. Each takes a
+# timeslot and that attribute's value and says whether the unit may use the
+# slot. A new restriction (branch or faculty availability, say) is a new
+# entry here plus the attribute on the units from build_assignments.
+SLOT_RULES = {
+    'year': lambda slot, year: year_group_admits(slot.applicable_year_group, year),
+}
+
+def compile_slot_mask(timeslots, admits):
+    """Bitmask of the positions in timeslots whose slot passes admits(slot)."""
+    mask = 0
+    for pos, slot in enumerate(timeslots):
+        if admits(slot):
+            mask |= 1 << pos
+    return mask
+
+def year_slot_mask(timeslots, year):
+    """Bitmask of the timeslot positions a class of the given year may use."""
+    return compile_slot_mask(timeslots, lambda slot: year_group_admits(slot.applicable_year_group, year))
+
+def build_eligibility_index(timeslots, values):
+    """
+    Compiles SLOT_RULES once per run. values maps a rule's attribute to the
+    values it takes (e.g. {'year': {1, 2, 3}}); the result maps attribute
+    to {value: slot bitmask}.
+    """
+    index = {}
+    for attr, rule in SLOT_RULES.items():
+        index[attr] = {
+            value: compile_slot_mask(timeslots, lambda slot, value=value: rule(slot, value))
+            for value in values.get(attr, ())
+        }
+    return index
+
+def eligible_slots(context, unit):
+    """
+    Bitmask of the slots a unit may use: the AND of its masks in
+    context['eligibility']. Values the index has not seen yet are compiled
+    and added, so contexts built without an index work too.
+    """
+    timeslots = context['timeslots']
+    index = context.get('eligibility')
+    if index is None:
+        index = context['eligibility'] = {}
+    mask = (1 << len(timeslots)) - 1
+    for attr, rule in SLOT_RULES.items():
+        if attr not in unit:
+            continue
+        masks = index.setdefault(attr, {})
+        value = unit[attr]
+        if value not in masks:
+            masks[value] = compile_slot_mask(timeslots, lambda slot: rule(slot, value))
+        mask &= masks[value]
+    return mask
+
+def slot_positions(context, mask):
+    """Positions of the set bits of mask, ascending; cached per context."""
+    cache = context.get('slot_positions')
+    if cache is None:
+        cache = context['slot_positions'] = {}
+    positions = cache.get(mask)
+    if positions is None:
+        positions = cache[mask] = [pos for pos in range(mask.bit_length()) if mask >> pos & 1]
+    return positions
@@ -0,0 +1,132 @@
+from backend.eligibility import year_slot_mask
+from collections import defaultdict
+from itertools import combinations
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+def _problem(kind, resource, required, available, message):
+    return {
+        'kind': kind,
+        'resource': resource,
+        'required': required,
+        'available': available,
+        'message': message
+    }
+
+def analyze_feasibility(data):
+    """
+    Cheap lower-bound checks over the output of fetch_scheduling_data_orm.
+
+    Returns a list of problems, each naming the over-subscribed resource with
+    the hours it needs and the hours it can offer. An empty list does not
+    prove a timetable exists; a non-empty one proves it does not.
+    """
+    problems = []
+    timeslots = data['timeslots']
+    classes = {c.class_id: c for c in data['classes']}
+    year_masks = {}
+
+    def slots_for(year):
+        if year not in year_masks:
+            year_masks[year] = year_slot_mask(timeslots, year)
+        return year_masks[year]
+
+    # Per-class hours against the slots its year group may use.
+    for cls_id, reqs in data['class_subject_requirements'].items():
+        cls = classes.get(cls_id)
+        if not cls:
+            continue
+        required = sum(hours for _, hours, _ in reqs)
+        available = popcount(slots_for(cls.year))
+        if required > available:
+            problems.append(_problem(
+                'class_hours', f'Class {cls.class_name or cls_id}', required, available,
+                f'Class {cls.class_name or cls_id} needs {required} periods but year {cls.year} '
+                f'only has {available} eligible slots.'
+            ))
+
+    # Subjects nobody can teach, and per-faculty load for sole teachers.
+    subject_hours = defaultdict(int)
+    subject_years = defaultdict(set)
+    for cls_id, reqs in data['class_subject_requirements'].items():
+        cls = classes.get(cls_id)
+        if not cls:
+            continue
+        for subject_id, hours, _ in reqs:
+            subject_hours[subject_id] += hours
+            subject_years[subject_id].add(cls.year)
+
+    faculty_hours = defaultdict(int)
+    faculty_slots = defaultdict(int)
+    for subject_id, hours in subject_hours.items():
+        subject = data['subjects'].get(subject_id)
+        fac_ids = list(subject.faculty_ids) if subject else []
+        name = subject.code if subject else subject_id
+        if not fac_ids:
+            problems.append(_problem(
+                'unmapped_subject', f'Subject {name}', hours, 0,
+                f'Subject {name} needs {hours} periods but no faculty is mapped to it.'
+            ))
+            continue
+
+        eligible = 0
+        for year in subject_years[subject_id]:
+            eligible |= slots_for(year)
+        capacity = len(fac_ids) * popcount(eligible)
+        if hours > capacity:
+            problems.append(_problem(
+                'subject_hours', f'Subject {name}', hours, capacity,
+                f'Subject {name} needs {hours} periods but its {len(fac_ids)} faculty '
+                f'can cover at most {capacity}.'
+            ))
+        if len(fac_ids) == 1:
+            faculty_hours[fac_ids[0]] += hours
+            faculty_slots[fac_ids[0]] |= eligible
+
+    for fac_id, required in faculty_hours.items():
+        available = popcount(faculty_slots[fac_id])
+        if required > available:
+            faculty = data['faculties'].get(fac_id)
+            name = faculty.name if faculty else fac_id
+            problems.append(_problem(
+                'faculty_hours', f'Faculty {name}', required, available,
+                f'Faculty {name} is the only teacher for {required} periods '
+                f'but only {available} slots are available to them.'
+            ))
+
+    # Room capacity per kind. Years sharing an eligible-slot mask form one
+    # group, and every combination of groups is checked against the rooms
+    # over the union of their slots (e.g. years 2 and 3 on '2-3+' and 'ALL').
+    for is_lab, label in ((True, 'lab'), (False, 'lecture')):
+        rooms = sum(1 for loc in data['locations'] if bool(loc.is_lab) == is_lab)
+        hours_by_mask = defaultdict(int)
+        years_by_mask = defaultdict(set)
+        for cls_id, reqs in data['class_subject_requirements'].items():
+            cls = classes.get(cls_id)
+            if not cls:
+                continue
+            hours = sum(hours for _, hours, lab in reqs if bool(lab) == is_lab)
+            if hours:
+                hours_by_mask[slots_for(cls.year)] += hours
+                years_by_mask[slots_for(cls.year)].add(cls.year)
+
+        masks = sorted(hours_by_mask)
+        for size in range(1, len(masks) + 1):
+            for combo in combinations(masks, size):
+                required = sum(hours_by_mask[m] for m in combo)
+                eligible = 0
+                years = set()
+                for m in combo:
+                    eligible |= m
+                    years |= years_by_mask[m]
+                available = rooms * popcount(eligible)
+                if required > available:
+                    scope = 'year' + ('s ' if len(years) > 1 else ' ') + ', '.join(str(y) for y in sorted(years))
+                    problems.append(_problem(
+                        f'{label}_rooms', f'{label.capitalize()} rooms ({scope})', required, available,
+                        f'{scope.capitalize()} need(s) {required} {label} periods but {rooms} {label} '
+                        f'room(s) over the eligible slots offer only {available}.'
+                    ))
+
+    return problems
@@ -0,0 +1,292 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from backend.database import db, parse_bool
+from backend.eligibility import YEAR_GROUPS
+from backend.models import (
+    Faculty, Subject, Branch, Section, Class, Location, TimeSlot, ClassSubject, faculty_subjects
+)
+import csv
+import datetime as dt
+import io
+import json
+
+import_bp = Blueprint('imports', __name__)
+
+# Rows validated, inserted (one executemany) and committed together.
+IMPORT_CHUNK_SIZE = 1000
+# Row errors listed in a response; error_count always covers all of them.
+MAX_REPORTED_ERRORS = 500
+
+class RowError(ValueError):
+    pass
+
+def _text(row, key, required=True):
+    value = row.get(key)
+    value = str(value).strip() if value is not None else ''
+    if required and not value:
+        raise RowError(f'{key} is required')
+    return value or None
+
+def _int(row, key, required=True, default=None):
+    value = row.get(key)
+    if value is None or value == '':
+        if required:
+            raise RowError(f'{key} is required')
+        return default
+    if isinstance(value, bool):
+        raise RowError(f'{key} must be an integer')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'{key} must be an integer')
+
+def _bool(row, key):
+    value = row.get(key)
+    if value is None:
+        return False
+    try:
+        return parse_bool(value)
+    except ValueError:
+        raise RowError(f'{key} must be true or false')
+
+def _time(row, key):
+    try:
+        return dt.time.fromisoformat(_text(row, key))
+    except ValueError:
+        raise RowError(f'{key} must be a time like 09:00')
+
+def _resolve(row, lookups, name, id_key, code_keys):
+    """An id from row[id_key], or from the first of code_keys present,
+    through the code -> id maps loaded for the import."""
+    ids, by_code = lookups[name]
+    if row.get(id_key) not in (None, ''):
+        value = _int(row, id_key)
+        if value not in ids:
+            raise RowError(f'unknown {id_key} {value}')
+        return value
+    for key in code_keys:
+        code = _text(row, key, required=False)
+        if code is not None:
+            if code not in by_code[key]:
+                raise RowError(f'unknown {key} "{code}"')
+            return by_code[key][code]
+    raise RowError(f'one of {", ".join((id_key,) + code_keys)} is required')
+
+def _id_maps(id_column, **codes):
+    """(set of ids, {input key: {value: id}}) from one SELECT; codes maps
+    each input key to the column it names rows by."""
+    keys = list(codes)
+    ids, by_code = set(), {key: {} for key in keys}
+    for row in db.session.execute(select(id_column, *codes.values())):
+        ids.add(row[0])
+        for key, value in zip(keys, row[1:]):
+            if value is not None:
+                by_code[key][value] = row[0]
+    return ids, by_code
+
+def _existing(*columns):
+    return {tuple(row) for row in db.session.execute(select(*columns))}
+
+def _faculty(row, lookups):
+    code = _text(row, 'faculty_code', required=False)
+    return {'name': _text(row, 'name'), 'faculty_code': code}, [('faculty_code', code)] if code else []
+
+def _subject(row, lookups):
+    code = _text(row, 'code')
+    return {'code': code, 'name': _text(row, 'name'), 'is_lab': _bool(row, 'is_lab')}, [('code', code)]
+
+def _branch(row, lookups):
+    name, code = _text(row, 'name'), _text(row, 'code', required=False)
+    return {'name': name, 'code': code}, [('name', name)] + ([('code', code)] if code else [])
+
+def _section(row, lookups):
+    name = _text(row, 'name')
+    return {'name': name}, [('name', name)]
+
+def _class(row, lookups):
+    branch_id = _resolve(row, lookups, 'branches', 'branch_id', ('branch_code', 'branch_name'))
+    section_id = _resolve(row, lookups, 'sections', 'section_id', ('section_name',))
+    year = _int(row, 'year')
+    if year < 1:
+        raise RowError('year must be 1 or more')
+    class_name = _text(row, 'class_name', required=False) or \
+        f"{lookups['branch_names'][branch_id]} Year {year} Section {lookups['section_names'][section_id]}"
+    values = {'branch_id': branch_id, 'section_id': section_id, 'year': year, 'class_name': class_name}
+    return values, [('class_name', class_name)]
+
+def _location(row, lookups):
+    return {
+        'room_no': _text(row, 'room_no'),
+        'building': _text(row, 'building', required=False),
+        'is_lab': _bool(row, 'is_lab')
+    }, []
+
+def _timeslot(row, lookups):
+    year_group = _text(row, 'applicable_year_group')
+    if year_group not in YEAR_GROUPS:
+        raise RowError(f'applicable_year_group must be one of: {", ".join(YEAR_GROUPS)}')
+    return {
+        'day_of_week': _text(row, 'day_of_week'),
+        'period_number': _int(row, 'period_number'),
+        'start_time': _time(row, 'start_time'),
+        'end_time': _time(row, 'end_time'),
+        'applicable_year_group': year_group
+    }, []
+
+def _faculty_subject(row, lookups):
+    faculty_id = _resolve(row, lookups, 'faculties', 'faculty_id', ('faculty_code',))
+    subject_id = _resolve(row, lookups, 'subjects', 'subject_id', ('subject_code',))
+    return {'faculty_id': faculty_id, 'subject_id': subject_id}, [('pair', (faculty_id, subject_id))]
+
+def _class_subject(row, lookups):
+    class_id = _resolve(row, lookups, 'classes', 'class_id', ('class_name',))
+    subject_id = _resolve(row, lookups, 'subjects', 'subject_id', ('subject_code',))
+    hours = _int(row, 'hours_per_week', required=False, default=1)
+    if hours < 1:
+        raise RowError('hours_per_week must be 1 or more')
+    values = {'class_id': class_id, 'subject_id': subject_id, 'hours_per_week': hours}
+    return values, [('pair', (class_id, subject_id))]
+
+def _unique(*pairs):
+    return {key: {value for (value,) in _existing(column)} for key, column in pairs}
+
+# Per resource: the table written, a loader for the lookups (one query per
+# table) and a function turning one input row into (values, unique keys).
+# Unique keys are checked against the database and the rows before them.
+
+IMPORTS = {
+    'faculties': (Faculty.__table__, lambda: {'unique': _unique(('faculty_code', Faculty.faculty_code))}, _faculty),
+    'subjects': (Subject.__table__, lambda: {'unique': _unique(('code', Subject.code))}, _subject),
+    'branches': (Branch.__table__, lambda: {'unique': _unique(('name', Branch.name), ('code', Branch.code))}, _branch),
+    'sections': (Section.__table__, lambda: {'unique': _unique(('name', Section.name))}, _section),
+    'classes': (Class.__table__, lambda: {
+        'branches': _id_maps(Branch.branch_id, branch_code=Branch.code, branch_name=Branch.name),
+        'sections': _id_maps(Section.section_id, section_name=Section.name),
+        'unique': _unique(('class_name', Class.class_name)),
+    }, _class),
+    'locations': (Location.__table__, lambda: {'unique': {}}, _location),
+    'timeslots': (TimeSlot.__table__, lambda: {'unique': {}}, _timeslot),
+    'faculty-subjects': (faculty_subjects, lambda: {
+        'faculties': _id_maps(Faculty.faculty_id, faculty_code=Faculty.faculty_code),
+        'subjects': _id_maps(Subject.subject_id, subject_code=Subject.code),
+        'unique': {'pair': _existing(faculty_subjects.c.faculty_id, faculty_subjects.c.subject_id)},
+    }, _faculty_subject),
+    'class-subjects': (ClassSubject.__table__, lambda: {
+        'classes': _id_maps(Class.class_id, class_name=Class.class_name),
+        'subjects': _id_maps(Subject.subject_id, subject_code=Subject.code),
+        'unique': {'pair': _existing(ClassSubject.class_id, ClassSubject.subject_id)},
+    }, _class_subject),
+}
+
+def _add_names(lookups):
+    # Default class names need the branch and section names by id.
+    for name, key in (('branches', 'branch_name'), ('sections', 'section_name')):
+        if name in lookups:
+            lookups[key + 's'] = {i: n for n, i in lookups[name][1][key].items()}
+
+def read_rows():
+    """
+    Yields (row number, dict) from the request body: a JSON array (or
+    {"rows": [...]}), CSV with a header line (text/csv) or one JSON object
+    per line (application/x-ndjson). CSV and NDJSON are read from the
+    request stream line by line. A row that cannot be parsed is yielded
+    as its RowError.
+    """
+    mimetype = request.mimetype
+    if mimetype == 'text/csv':
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+    elif mimetype in ('application/x-ndjson', 'application/jsonl'):
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8')
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield number, RowError('not valid JSON')
+                continue
+            yield number, row if isinstance(row, dict) else RowError('must be a JSON object')
+    else:
+        body = request.get_json(silent=True)
+        rows = body.get('rows') if isinstance(body, dict) else body
+        if not isinstance(rows, list):
+            raise RowError('Send a JSON array of rows, {"rows": [...]}, CSV (text/csv) or NDJSON (application/x-ndjson)')
+        for number, row in enumerate(rows, start=1):
+            yield number, row if isinstance(row, dict) else RowError('must be a JSON object')
+
+def import_rows(resource, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Validates and inserts (row number, row) pairs for one IMPORTS resource.
+    Codes are resolved through maps loaded once up front; each chunk of
+    valid rows is one executemany and one commit. Returns the summary
+    with per-row errors.
+    """
+    table, load, prepare = IMPORTS[resource]
+    lookups = load()
+    _add_names(lookups)
+    unique = lookups['unique']
+    summary = {'resource': resource, 'received': 0, 'inserted': 0, 'error_count': 0, 'errors': []}
+
+    def fail(number, message):
+        summary['error_count'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'row': number, 'error': message})
+
+    def flush(chunk):
+        if not chunk:
+            return
+        try:
+            db.session.execute(insert(table), [values for _, values in chunk])
+            db.session.commit()
+            summary['inserted'] += len(chunk)
+        except IntegrityError as e:
+            db.session.rollback()
+            for number, _ in chunk:
+                fail(number, f'rejected by the database: {e.orig}')
+
+    chunk = []
+    for number, row in rows:
+        summary['received'] += 1
+        try:
+            if isinstance(row, RowError):
+                raise row
+            values, keys = prepare(row, lookups)
+            for key, value in keys:
+                if value in unique[key]:
+                    raise RowError(f'{key} {value} already exists')
+            for key, value in keys:
+                unique[key].add(value)
+        except RowError as e:
+            fail(number, str(e))
+            continue
+        chunk.append((number, values))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    flush(chunk)
+    return summary
+
+@import_bp.route('/import/<resource>', methods=['POST'])
+def bulk_import(resource):
+    """
+    Bulk-creates rows of one resource (see IMPORTS). Rows that fail
+    validation are skipped and listed with their row number; the rest are
+    inserted.
+    """
+    if resource not in IMPORTS:
+        return jsonify({'error': f'Unknown resource; use one of: {", ".join(IMPORTS)}'}), 404
+    try:
+        summary = import_rows(resource, read_rows())
+    except RowError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error importing {resource}: {e}")
+        return jsonify({'error': 'An internal server error occurred'}), 500
+    print(f"Imported {summary['inserted']} of {summary['received']} {resource} row(s).")
+    return jsonify(summary), 200
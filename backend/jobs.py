@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import uuid
+
+# Generation jobs run one at a time: two solves rewriting timetable_entries
+# at once would clobber each other.
+JOB_WORKERS = 1
+# Finished jobs kept around for polling before the oldest are dropped.
+MAX_FINISHED_JOBS = 50
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='timetable-job')
+_jobs = {}
+_lock = threading.Lock()
+
+def submit_job(app, target):
+    """
+    Queues target(progress, cancel) on the background worker and returns the
+    new job id. target runs inside an app context, may update the progress
+    dict as it goes, should stop once the cancel event is set, and returns
+    (payload, http_status).
+    """
+    job = {
+        'job_id': uuid.uuid4().hex,
+        'status': 'queued',
+        'progress': {},
+        'cancel': threading.Event(),
+        'created_at': time.time(),
+        'started_at': None,
+        'finished_at': None,
+        'result': None,
+        'http_status': None
+    }
+    with _lock:
+        _jobs[job['job_id']] = job
+        _prune()
+    _executor.submit(_run, app, job, target)
+    return job['job_id']
+
+def _run(app, job, target):
+    if job['cancel'].is_set():
+        job['status'] = 'cancelled'
+        job['finished_at'] = time.time()
+        return
+
+    job['status'] = 'running'
+    job['started_at'] = time.time()
+    try:
+        with app.app_context():
+            payload, http_status = target(job['progress'], job['cancel'])
+        job['result'] = payload
+        job['http_status'] = http_status
+        if job['cancel'].is_set():
+            job['status'] = 'cancelled'
+        else:
+            job['status'] = 'succeeded' if http_status < 400 else 'failed'
+    except Exception as e:
+        print(f"Error in background job {job['job_id']}: {e}")
+        job['result'] = {'error': str(e)}
+        job['http_status'] = 500
+        job['status'] = 'failed'
+    finally:
+        job['finished_at'] = time.time()
+
+def _prune():
+    finished = [j for j in _jobs.values() if j['finished_at'] is not None]
+    finished.sort(key=lambda j: j['finished_at'])
+    for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        del _jobs[job['job_id']]
+
+def is_active(job):
+    return job['status'] in ('queued', 'running')
+
+def get_job(job_id):
+    """JSON-safe snapshot of a job, or None if it is unknown."""
+    job = _jobs.get(job_id)
+    if not job:
+        return None
+    end = job['finished_at'] or time.time()
+    return {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'progress': dict(job['progress']),
+        'elapsed': round(end - job['started_at'], 3) if job['started_at'] else 0,
+        'result': job['result'],
+        'http_status': job['http_status']
+    }
+
+def cancel_job(job_id):
+    """Asks a job to stop. Returns its snapshot, or None if it is unknown."""
+    job = _jobs.get(job_id)
+    if not job:
+        return None
+    job['cancel'].set()
+    return get_job(job_id)
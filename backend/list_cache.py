@@ -0,0 +1,117 @@
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import hashlib
+import threading
+
+# Serialized list responses kept; the least recently used one is dropped first.
+MAX_CACHED_LISTS = 256
+# Tables each cached list is read from. A committed write to any of them
+# moves the list to a new version.
+LIST_TABLES = {
+    'reminders': ('reminders',),
+    'faculties': ('faculties',),
+    'subjects': ('subjects',),
+    'branches': ('branches',),
+    'sections': ('sections',),
+    'classes': ('classes', 'branches', 'sections'),
+    'locations': ('locations',),
+    'timeslots': ('timeslots',),
+}
+WATCHED_TABLES = {table for tables in LIST_TABLES.values() for table in tables}
+
+_versions = defaultdict(int)
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def list_version(name):
+    return tuple(_versions[table] for table in LIST_TABLES[name])
+
+def bump_tables(tables):
+    with _lock:
+        for table in tables:
+            _versions[table] += 1
+
+def clear_list_cache():
+    with _lock:
+        _cache.clear()
+
+def _respond(body, etag, mimetype):
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, status=200, mimetype=mimetype)
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate it on every use.
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def cached_list(name):
+    """
+    Decorator for a GET list endpoint reading the LIST_TABLES of name.
+    Successful responses are kept per query string together with the
+    version of their tables and a strong ETag (a hash of the body). While
+    the version holds, requests are answered from memory, and a matching
+    If-None-Match gets a 304; neither touches the database.
+
+    The versions live in this process, so with several worker processes a
+    write is only seen at once by the worker that made it.
+    """
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (name, request.query_string)
+            version = list_version(name)
+            with _lock:
+                hit = _cache.get(key)
+                if hit is not None and hit[0] == version:
+                    _cache.move_to_end(key)
+                    return _respond(*hit[1:])
+
+            result = view(*args, **kwargs)
+            response, status = result if isinstance(result, tuple) else (result, 200)
+            if status != 200:
+                return result
+            body = response.get_data()
+            entry = (version, body, hashlib.sha256(body).hexdigest()[:32], response.mimetype)
+            with _lock:
+                _cache[key] = entry
+                _cache.move_to_end(key)
+                while len(_cache) > MAX_CACHED_LISTS:
+                    _cache.popitem(last=False)
+            return _respond(*entry[1:])
+        return wrapper
+    return decorate
+
+# Writes are noted per session and applied on commit, so a list read
+# between a flush and its commit cannot be cached under the new version.
+
+def _pending(session):
+    return session.info.setdefault('list_cache_tables', set())
+
+@event.listens_for(Session, 'after_flush')
+def _note_flush(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(instance, '__tablename__', None)
+        if table in WATCHED_TABLES:
+            _pending(session).add(table)
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(getattr(orm_execute_state.statement, 'table', None), 'name', None)
+    if table in WATCHED_TABLES:
+        _pending(orm_execute_state.session).add(table)
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    tables = session.info.pop('list_cache_tables', None)
+    if tables:
+        bump_tables(tables)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_on_rollback(session):
+    session.info.pop('list_cache_tables', None)
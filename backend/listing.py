@@ -0,0 +1,149 @@
+from flask import request, jsonify
+from sqlalchemy import and_, or_, select
+from backend.database import db, parse_bool, time_converter
+import base64
+import datetime as dt
+import json
+
+# Largest page a list endpoint hands out; also the default with ?cursor=.
+MAX_PAGE_SIZE = 500
+
+class ListError(ValueError):
+    pass
+
+class ListSpec(object):
+    """
+    How a list endpoint reads its table.
+
+    fields maps each output field to a column expression, in output order;
+    order is the sort key as expressions and must end in a unique column so
+    the keyset is total; filters maps query parameters to the expression
+    they compare with (equality); joins are (target, onclause) pairs for
+    fields that come from other tables.
+    """
+    def __init__(self, source, fields, order, filters=None, joins=()):
+        self.source = source
+        self.fields = fields
+        self.order = order
+        self.filters = filters or {}
+        self.joins = joins
+
+def json_value(value):
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    if isinstance(value, dt.time):
+        return time_converter(value)
+    return value
+
+def _cursor_value(value):
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat()
+    return value
+
+def _parse(expr, value):
+    """A query-string or cursor value as the Python type of expr."""
+    try:
+        python_type = expr.type.python_type
+    except NotImplementedError:
+        return value
+    if value is None or isinstance(value, python_type):
+        return value
+    if python_type is bool:
+        return parse_bool(value)
+    if python_type in (dt.datetime, dt.date, dt.time):
+        return python_type.fromisoformat(value)
+    return python_type(value)
+
+def encode_cursor(values):
+    raw = json.dumps([_cursor_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, order):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(order):
+            raise ValueError
+        return [_parse(expr, value) for expr, value in zip(order, values)]
+    except (TypeError, ValueError):
+        raise ListError('Invalid cursor')
+
+def _after(order, values):
+    """Rows strictly after values in the order: the expanded form of the
+    row-value comparison (a, b, c) > (x, y, z), which every backend can
+    answer from an index on the sort columns."""
+    clauses = []
+    for i, (expr, value) in enumerate(zip(order, values)):
+        equal = [order[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, expr > value))
+    return or_(*clauses)
+
+def _args(spec):
+    names = request.args.get('fields')
+    if names:
+        names = [n.strip() for n in names.split(',') if n.strip()]
+        unknown = [n for n in names if n not in spec.fields]
+        if unknown:
+            raise ListError(f'Unknown field(s) {", ".join(unknown)}; choose from {", ".join(spec.fields)}')
+    else:
+        names = list(spec.fields)
+
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ListError('limit must be an integer')
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ListError(f'limit must be from 1 to {MAX_PAGE_SIZE}')
+    elif cursor:
+        limit = MAX_PAGE_SIZE
+
+    conditions = []
+    for name, expr in spec.filters.items():
+        value = request.args.get(name)
+        if value is not None:
+            try:
+                conditions.append(expr == _parse(expr, value))
+            except ValueError:
+                raise ListError(f'Invalid value for {name}')
+    if cursor:
+        conditions.append(_after(spec.order, decode_cursor(cursor, spec.order)))
+    return names, limit, conditions
+
+def list_rows(spec):
+    """
+    Serves a list endpoint from spec. Only the columns of ?fields= (default
+    all) and the sort key are selected. With ?limit= or ?cursor= the reply
+    is one page, {"items": [...], "next_cursor": ...}, read with keyset
+    pagination from the cursor onwards; without them it is the whole list
+    as a JSON array, as before. Filters are further query parameters.
+    """
+    try:
+        names, limit, conditions = _args(spec)
+        query = select(*(spec.fields[n].label(n) for n in names),
+                       *(expr.label(f'_order{i}') for i, expr in enumerate(spec.order)))
+        query = query.select_from(spec.source)
+        for target, onclause in spec.joins:
+            query = query.join(target, onclause)
+        query = query.where(*conditions).order_by(*spec.order)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        rows = db.session.execute(query).all()
+    except ListError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error listing rows: {e}")
+        return jsonify({'error': 'An internal server error occurred'}), 500
+
+    more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if limit is not None else rows
+    items = [{n: json_value(row._mapping[n]) for n in names} for row in rows]
+    if limit is None:
+        return jsonify(items), 200
+    next_cursor = None
+    if more:
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor([last[f'_order{i}'] for i in range(len(spec.order))])
+    return jsonify({'items': items, 'next_cursor': next_cursor}), 200
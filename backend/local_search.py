@@ -0,0 +1,215 @@
+from backend.eligibility import eligible_slots, slot_positions
+from backend.progress import checkpoint
+from backend.stats import search_stats
+from collections import defaultdict
+
+# Iterations a unit may not move back to a slot it just left.
+TABU_TENURE = 10
+# Chance of a random move instead of the best one, to escape plateaus.
+NOISE = 0.05
+# Default move budget per unit when the context gives no max_steps.
+STEPS_PER_UNIT = 100
+# Occupant of a cell already taken in the context's busy bitmasks.
+FIXED = -1
+
+def solve_timetable_min_conflicts(assignments_needed, context):
+    """
+    Local-search solver: greedy start, then min-conflicts repair with tabu.
+
+    Every unit is placed up front, minimising clashes but allowing them.
+    The search then repeatedly lifts a unit that is in a clash and moves it
+    to the slot, faculty and room with the fewest clashes. Moving back to a
+    recently vacated slot is tabu unless that move is clash-free. Occupancy
+    is kept as sets of units per (class|faculty|room, slot) cell, so each
+    move updates the violation counter incrementally. Cells already busy in
+    the context (kept entries of an incremental run) hold FIXED, so using
+    them always counts as a clash.
+
+    Fills the context like the backtracking engines do: results and busy
+    bitmasks on success, and context['best_results'] (the least-conflicted
+    state with the clashing units dropped) on failure. It honours
+    context['max_steps'], warm-start context['hints'] and the usual
+    checkpoint; progress reports the clash-free units as placed and the
+    repair moves as backtracks. In
+    context['stats'] every placement or move counts as a node and every
+    slot evaluated as a candidate tried; there are no backtracks.
+    """
+    timeslots = context['timeslots']
+    rng = context['rng']
+    context['best_results'] = []
+    n = len(assignments_needed)
+    if not n:
+        return True
+
+    unit_class, unit_faculty, unit_rooms, unit_slots = [], [], [], []
+    for unit in assignments_needed:
+        slots = slot_positions(context, eligible_slots(context, unit))
+        fac_ids = context['subject_faculty'].get(unit['subject_id'], [])
+        rooms = context['lab_rooms'] if unit['is_lab'] else context['lecture_rooms']
+        if not fac_ids or not rooms or not slots:
+            return False
+        unit_class.append(unit['class_id'])
+        unit_faculty.append(fac_ids)
+        unit_rooms.append(rooms)
+        unit_slots.append(slots)
+
+    cells = defaultdict(set)
+    for kind, busy in (('class', context['class_schedule']), ('faculty', context['faculty_schedule']),
+                       ('room', context['location_schedule'])):
+        for owner, mask in busy.items():
+            while mask:
+                low = mask & -mask
+                cells[(kind, owner, low.bit_length() - 1)].add(FIXED)
+                mask ^= low
+    assign = [None] * n
+    violations = 0
+
+    def cell_keys(i, pos, fac_id, loc_id):
+        return (('class', unit_class[i], pos), ('faculty', fac_id, pos), ('room', loc_id, pos))
+
+    def place(i, pos, fac_id, loc_id):
+        nonlocal violations
+        for key in cell_keys(i, pos, fac_id, loc_id):
+            occupants = cells[key]
+            if occupants:
+                violations += 1
+            occupants.add(i)
+        assign[i] = (pos, fac_id, loc_id)
+
+    def lift(i):
+        nonlocal violations
+        for key in cell_keys(i, *assign[i]):
+            occupants = cells[key]
+            occupants.discard(i)
+            if occupants:
+                violations -= 1
+
+    def clashes(key):
+        occupants = cells.get(key)
+        return len(occupants) if occupants else 0
+
+    def best_at(i, pos):
+        """Cheapest faculty and room for unit i (already lifted) at slot pos."""
+        fac_id = min(unit_faculty[i], key=lambda f: (clashes(('faculty', f, pos)), rng.random()))
+        loc_id, loc_cost = None, None
+        for candidate in unit_rooms[i]:
+            cost = clashes(('room', candidate, pos))
+            if loc_cost is None or cost < loc_cost:
+                loc_id, loc_cost = candidate, cost
+                if not cost:
+                    break
+        cost = clashes(('class', unit_class[i], pos)) + clashes(('faculty', fac_id, pos)) + loc_cost
+        return cost, fac_id, loc_id
+
+    def in_clash(i):
+        return any(len(cells[key]) > 1 for key in cell_keys(i, *assign[i]))
+
+    # Greedy start, taking a unit's warm-start hint when it is still clash-free.
+    hints = {key: list(h) for key, h in context.get('hints', {}).items()}
+    tried = 0
+    for i in range(n):
+        hinted = hints.get((unit_class[i], assignments_needed[i]['subject_id']))
+        if hinted:
+            pos, fac_id, loc_id = hinted.pop()
+            if fac_id in unit_faculty[i] and loc_id in unit_rooms[i] and pos in unit_slots[i] \
+                    and not any(clashes(key) for key in cell_keys(i, pos, fac_id, loc_id)):
+                place(i, pos, fac_id, loc_id)
+                continue
+        best = None
+        for pos in unit_slots[i]:
+            tried += 1
+            cost, fac_id, loc_id = best_at(i, pos)
+            if best is None or cost < best[0]:
+                best = (cost, pos, fac_id, loc_id)
+                if not cost:
+                    break
+        place(i, *best[1:])
+
+    conflicted = {i for i in range(n) if in_clash(i)}
+    best_violations, best_assign = violations, list(assign)
+    tabu = {}
+    max_steps = context.get('max_steps') or STEPS_PER_UNIT * n
+    moves = 0
+
+    for step in range(max_steps):
+        if not conflicted:
+            break
+        if not step & 255 and checkpoint(context, n - len(conflicted), step):
+            break
+
+        i = rng.choice(tuple(conflicted))
+        old = assign[i]
+        lift(i)
+        moves += 1
+
+        if rng.random() < NOISE:
+            pos = rng.choice(unit_slots[i])
+            _, fac_id, loc_id = best_at(i, pos)
+            tried += 1
+        else:
+            tried += len(unit_slots[i])
+            choices, choice_cost = [], None
+            for pos in unit_slots[i]:
+                cost, fac_id, loc_id = best_at(i, pos)
+                if tabu.get((i, pos), -1) > step and cost:
+                    continue
+                if choice_cost is None or cost < choice_cost:
+                    choices, choice_cost = [(pos, fac_id, loc_id)], cost
+                elif cost == choice_cost:
+                    choices.append((pos, fac_id, loc_id))
+            pos, fac_id, loc_id = rng.choice(choices) if choices else old
+        place(i, pos, fac_id, loc_id)
+        tabu[(i, old[0])] = step + TABU_TENURE
+
+        # Only units sharing the vacated or the new cells can change status.
+        touched = {i}
+        for key in cell_keys(i, *old) + cell_keys(i, pos, fac_id, loc_id):
+            touched.update(cells[key])
+        touched.discard(FIXED)
+        for j in touched:
+            if in_clash(j):
+                conflicted.add(j)
+            else:
+                conflicted.discard(j)
+
+        if violations < best_violations:
+            best_violations, best_assign = violations, list(assign)
+
+    stats = search_stats(context)
+    stats['nodes'] += n + moves
+    stats['candidates_tried'] += tried
+
+    slot_ids = [slot.slot_id for slot in timeslots]
+
+    def as_result(i, pos, fac_id, loc_id):
+        return {
+            'class_id': unit_class[i], 'slot_id': slot_ids[pos],
+            'subject_id': assignments_needed[i]['subject_id'],
+            'faculty_id': fac_id, 'location_id': loc_id
+        }
+
+    if not conflicted:
+        class_busy = context['class_schedule']
+        faculty_busy = context['faculty_schedule']
+        location_busy = context['location_schedule']
+        for i, (pos, fac_id, loc_id) in enumerate(assign):
+            bit = 1 << pos
+            class_busy[unit_class[i]] |= bit
+            faculty_busy[fac_id] |= bit
+            location_busy[loc_id] |= bit
+            context['results'].append(as_result(i, pos, fac_id, loc_id))
+        context['best_results'] = context['results']
+        stats['peak_depth'] = max(stats['peak_depth'], n)
+        return True
+
+    # Keep the first unit in every clashing cell, drop the rest.
+    taken = {key for key, occupants in cells.items() if FIXED in occupants}
+    partial = []
+    for i, placement in enumerate(best_assign):
+        keys = cell_keys(i, *placement)
+        if not taken.intersection(keys):
+            taken.update(keys)
+            partial.append(as_result(i, *placement))
+    context['best_results'] = partial
+    stats['peak_depth'] = max(stats['peak_depth'], len(partial))
+    return False
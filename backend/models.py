@@ -1,6 +1,9 @@
 
 from backend.database import db
 from datetime import datetime
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
 
 # Association Tables
 faculty_subjects = db.Table('faculty_subjects',
@@ -15,8 +18,40 @@ class_subjects_req = db.Table('class_subjects_req',
     # The original schema had hours_per_week. So we should probably make this a Model.
 )
 
+# --- Change tracking for delta sync ---
+# Every committed write to a synced model stamps its rows with the next
+# value of one counter, shared by all the rows of that transaction.
+# Deletes leave a Tombstone stamped the same way. The counter row stays
+# locked from the first write until commit, so versions become visible in
+# order and a client reading "everything after N" never skips a row.
+
+def next_change_version(context):
+    """Column default: this transaction's change version, taking the next
+    one from the counter on its first write."""
+    conn = context.connection
+    transaction = conn.get_transaction()
+    current = conn.info.get('change_version')
+    if current is not None and current[0] is transaction:
+        return current[1]
+    counter = ChangeCounter.__table__
+    if not conn.execute(update(counter).where(counter.c.id == 1).values(value=counter.c.value + 1)).rowcount:
+        conn.execute(insert(counter).values(id=1, value=1))
+    version = conn.execute(select(counter.c.value).where(counter.c.id == 1)).scalar()
+    conn.info['change_version'] = (transaction, version)
+    return version
+
+@event.listens_for(Engine, 'commit')
+@event.listens_for(Engine, 'rollback')
+def _end_change_version(conn):
+    conn.info.pop('change_version', None)
+
+class SyncMixin(object):
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
+    row_version = db.Column(db.Integer, default=next_change_version, onupdate=next_change_version,
+                            nullable=True, index=True)
+
 # Since ClassSubjects had 'hours_per_week', we define it as a Model.
-class ClassSubject(db.Model):
+class ClassSubject(SyncMixin, db.Model):
     __tablename__ = 'class_subjects'
     class_subject_id = db.Column(db.Integer, primary_key=True)
     class_id = db.Column(db.Integer, db.ForeignKey('classes.class_id', ondelete='CASCADE'), nullable=False)
@@ -39,7 +74,7 @@ class Reminder(db.Model):
     text = db.Column(db.Text, nullable=False)
     reminder_datetime = db.Column(db.DateTime, nullable=False)
 
-class Faculty(db.Model):
+class Faculty(SyncMixin, db.Model):
     __tablename__ = 'faculties'
     faculty_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -47,25 +82,25 @@ class Faculty(db.Model):
     
     subjects = db.relationship('Subject', secondary=faculty_subjects, backref='faculties')
 
-class Subject(db.Model):
+class Subject(SyncMixin, db.Model):
     __tablename__ = 'subjects'
     subject_id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(50), nullable=False, unique=True)
     name = db.Column(db.String(255), nullable=False)
     is_lab = db.Column(db.Boolean, default=False, nullable=False)
 
-class Branch(db.Model):
+class Branch(SyncMixin, db.Model):
     __tablename__ = 'branches'
     branch_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False, unique=True)
     code = db.Column(db.String(20), unique=True, nullable=True)
 
-class Section(db.Model):
+class Section(SyncMixin, db.Model):
     __tablename__ = 'sections'
     section_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(10), nullable=False, unique=True)
 
-class Class(db.Model):
+class Class(SyncMixin, db.Model):
     __tablename__ = 'classes'
     class_id = db.Column(db.Integer, primary_key=True)
     branch_id = db.Column(db.Integer, db.ForeignKey('branches.branch_id', ondelete='CASCADE'), nullable=False)
@@ -77,14 +112,14 @@ class Class(db.Model):
     section = db.relationship('Section', backref='classes')
     requirements = db.relationship('ClassSubject', backref='class_obj', cascade="all, delete-orphan")
 
-class Location(db.Model):
+class Location(SyncMixin, db.Model):
     __tablename__ = 'locations'
     location_id = db.Column(db.Integer, primary_key=True)
     room_no = db.Column(db.String(50), nullable=False)
     building = db.Column(db.String(100), nullable=True)
     is_lab = db.Column(db.Boolean, default=False, nullable=False)
 
-class TimeSlot(db.Model):
+class TimeSlot(SyncMixin, db.Model):
     __tablename__ = 'timeslots'
     slot_id = db.Column(db.Integer, primary_key=True)
     day_of_week = db.Column(db.String(20), nullable=False) # Enum validation handled in app logic or DB constraints
@@ -93,9 +128,27 @@ class TimeSlot(db.Model):
     end_time = db.Column(db.Time, nullable=False)
     applicable_year_group = db.Column(db.String(10), nullable=False) # '1', '2-3+', 'ALL'
 
+class TimetableGeneration(db.Model):
+    __tablename__ = 'timetable_generations'
+    generation_id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    engine = db.Column(db.String(50), nullable=True)
+    seed = db.Column(db.String(100), nullable=True)
+    entry_count = db.Column(db.Integer, default=0, nullable=False)
+    complete = db.Column(db.Boolean, default=True, nullable=False)
+    soft_score = db.Column(db.Integer, nullable=True)
+
+class PublishedTimetable(db.Model):
+    # Single row (id 1) pointing at the generation readers see.
+    __tablename__ = 'published_timetable'
+    id = db.Column(db.Integer, primary_key=True)
+    generation_id = db.Column(db.Integer, db.ForeignKey('timetable_generations.generation_id', ondelete='SET NULL'), nullable=True)
+    published_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 class TimetableEntry(db.Model):
     __tablename__ = 'timetable_entries'
     entry_id = db.Column(db.Integer, primary_key=True)
+    generation_id = db.Column(db.Integer, db.ForeignKey('timetable_generations.generation_id', ondelete='CASCADE'), nullable=False)
     class_id = db.Column(db.Integer, db.ForeignKey('classes.class_id', ondelete='CASCADE'), nullable=False)
     slot_id = db.Column(db.Integer, db.ForeignKey('timeslots.slot_id', ondelete='CASCADE'), nullable=False)
     subject_id = db.Column(db.Integer, db.ForeignKey('subjects.subject_id', ondelete='CASCADE'), nullable=False)
@@ -104,9 +157,42 @@ class TimetableEntry(db.Model):
     lab_batch_info = db.Column(db.String(100), nullable=True)
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # One lecture per class, teacher and room per slot within a generation.
+    # These also serve the per-class/faculty/room reads; the slot index
+    # serves the per-day read.
+    __table_args__ = (
+        db.UniqueConstraint('generation_id', 'class_id', 'slot_id', name='uq_entry_class_slot'),
+        db.UniqueConstraint('generation_id', 'faculty_id', 'slot_id', name='uq_entry_faculty_slot'),
+        db.UniqueConstraint('generation_id', 'location_id', 'slot_id', name='uq_entry_location_slot'),
+        db.Index('ix_entry_generation_slot', 'generation_id', 'slot_id'),
+    )
+
     # Relationships
+    generation = db.relationship('TimetableGeneration')
     class_obj = db.relationship('Class')
     slot = db.relationship('TimeSlot')
     subject = db.relationship('Subject')
     faculty = db.relationship('Faculty')
     location = db.relationship('Location')
+
+class ChangeCounter(db.Model):
+    # Single row (id 1) holding the last change version handed out.
+    __tablename__ = 'change_counter'
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+
+class Tombstone(db.Model):
+    __tablename__ = 'tombstones'
+    tombstone_id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    row_version = db.Column(db.Integer, default=next_change_version, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+@event.listens_for(Session, 'before_flush')
+def _record_tombstones(session, flush_context, instances):
+    # Rows removed with Core delete() or by ON DELETE CASCADE in the
+    # database leave no tombstone.
+    for instance in list(session.deleted):
+        if isinstance(instance, SyncMixin):
+            session.add(Tombstone(table_name=instance.__tablename__, row_id=inspect(instance).identity[0]))
@@ -0,0 +1,196 @@
+from backend.eligibility import eligible_slots, slot_positions
+from collections import Counter, defaultdict
+import time
+
+# Weight of each soft constraint in the objective (lower totals are better).
+SOFT_WEIGHTS = {
+    'faculty_gaps': 1,        # idle periods between a teacher's first and last lecture of a day
+    'faculty_overload': 3,    # lectures beyond MAX_LECTURES_PER_DAY for a teacher on a day
+    'repeated_subject': 2,    # extra lectures of one subject for a class on the same day
+    'building_changes': 1,    # a teacher's consecutive periods in different buildings
+}
+MAX_LECTURES_PER_DAY = 4
+# Move budget for the optimization phase, per placed lecture.
+MOVES_PER_ENTRY = 200
+# Random (slot, faculty, room) draws per move before giving up on it.
+MOVE_DRAWS = 8
+
+def _gaps(mask):
+    if not mask:
+        return 0
+    low = (mask & -mask).bit_length() - 1
+    return mask.bit_length() - low - bin(mask).count('1')
+
+def _overload(mask):
+    return max(0, bin(mask).count('1') - MAX_LECTURES_PER_DAY)
+
+def slot_calendar(timeslots):
+    """(day number, period) per slot position. Slots without a day are all
+    taken as one day, in position order."""
+    days = {}
+    calendar = []
+    for pos, slot in enumerate(timeslots):
+        day = getattr(slot, 'day', None)
+        period = getattr(slot, 'period', None)
+        calendar.append((days.setdefault(day, len(days)), pos if period is None else period))
+    return calendar
+
+def new_objective(context):
+    """
+    Incremental soft-constraint score for a timetable under construction.
+    add_placement/remove_placement update it in O(1): they only touch the
+    teacher's day, the neighbouring periods and the class's subject-day
+    count of the entry that changes.
+    """
+    return {
+        'calendar': slot_calendar(context['timeslots']),
+        'positions': {slot.slot_id: pos for pos, slot in enumerate(context['timeslots'])},
+        'building': context.get('location_building', {}),
+        'periods': defaultdict(int),   # (faculty_id, day) -> bitmask of periods taught
+        'rooms': {},                   # (faculty_id, day, period) -> building
+        'subject_day': Counter(),      # (class_id, subject_id, day) -> lectures
+        'terms': dict.fromkeys(SOFT_WEIGHTS, 0),
+        'total': 0
+    }
+
+def _bump(state, term, delta):
+    if delta:
+        state['terms'][term] += delta
+        state['total'] += SOFT_WEIGHTS[term] * delta
+
+def _changes(state, fac_id, day, period, building):
+    if building is None:
+        return 0
+    rooms = state['rooms']
+    count = 0
+    for other in (period - 1, period + 1):
+        neighbour = rooms.get((fac_id, day, other))
+        if neighbour is not None and neighbour != building:
+            count += 1
+    return count
+
+def add_placement(state, r):
+    day, period = state['calendar'][state['positions'][r['slot_id']]]
+    fac_key = (r['faculty_id'], day)
+    old = state['periods'][fac_key]
+    new = old | 1 << period
+    state['periods'][fac_key] = new
+    _bump(state, 'faculty_gaps', _gaps(new) - _gaps(old))
+    _bump(state, 'faculty_overload', _overload(new) - _overload(old))
+
+    building = state['building'].get(r['location_id'])
+    _bump(state, 'building_changes', _changes(state, r['faculty_id'], day, period, building))
+    state['rooms'][(r['faculty_id'], day, period)] = building
+
+    subject_key = (r['class_id'], r['subject_id'], day)
+    if state['subject_day'][subject_key]:
+        _bump(state, 'repeated_subject', 1)
+    state['subject_day'][subject_key] += 1
+
+def remove_placement(state, r):
+    day, period = state['calendar'][state['positions'][r['slot_id']]]
+    fac_key = (r['faculty_id'], day)
+    old = state['periods'][fac_key]
+    new = old & ~(1 << period)
+    state['periods'][fac_key] = new
+    _bump(state, 'faculty_gaps', _gaps(new) - _gaps(old))
+    _bump(state, 'faculty_overload', _overload(new) - _overload(old))
+
+    building = state['rooms'].pop((r['faculty_id'], day, period), None)
+    _bump(state, 'building_changes', -_changes(state, r['faculty_id'], day, period, building))
+
+    subject_key = (r['class_id'], r['subject_id'], day)
+    state['subject_day'][subject_key] -= 1
+    if state['subject_day'][subject_key]:
+        _bump(state, 'repeated_subject', -1)
+
+def score_timetable(context, results):
+    """Full score of results: {'total': ..., 'terms': {...}}."""
+    state = new_objective(context)
+    for r in results:
+        add_placement(state, r)
+    return {'total': state['total'], 'terms': dict(state['terms'])}
+
+def optimize_timetable(assignments_needed, context, deadline=None, max_moves=None):
+    """
+    Optimization phase after a feasible timetable is found.
+
+    Hill-climbs on the soft objective with single-lecture moves: a random
+    lecture is lifted and a few random (slot, faculty, room) alternatives
+    that keep every hard constraint (eligibility, class/faculty/room free)
+    are drawn. The first one that does not make the score worse is kept,
+    so sideways moves let it cross plateaus. Each draw is scored with one
+    remove and one add on the incremental objective. Works on
+    context['results'] and the busy bitmasks in place, and stops at the
+    deadline, after max_moves (default MOVES_PER_ENTRY per lecture), or
+    when context['cancel'] is set. Returns a summary of the phase.
+    """
+    results = context['results']
+    rng = context['rng']
+    class_busy = context['class_schedule']
+    faculty_busy = context['faculty_schedule']
+    location_busy = context['location_schedule']
+    slot_ids = [slot.slot_id for slot in context['timeslots']]
+    units = {(u['class_id'], u['subject_id']): u for u in assignments_needed}
+    rooms = {True: context['lab_rooms'], False: context['lecture_rooms']}
+
+    state = new_objective(context)
+    for r in results:
+        add_placement(state, r)
+    before = state['total']
+    if max_moves is None:
+        max_moves = MOVES_PER_ENTRY * len(results)
+
+    tried = accepted = 0
+    cancel = context.get('cancel')
+    for move in range(max_moves):
+        if not results or not state['total']:
+            break
+        if not move & 255 and ((deadline is not None and time.monotonic() >= deadline)
+                               or (cancel is not None and cancel.is_set())):
+            break
+
+        r = rng.choice(results)
+        unit = units[(r['class_id'], r['subject_id'])]
+        positions = slot_positions(context, eligible_slots(context, unit))
+        fac_ids = context['subject_faculty'].get(r['subject_id'], ())
+        loc_ids = rooms[bool(unit['is_lab'])]
+        old_bit = 1 << state['positions'][r['slot_id']]
+        old = dict(r)
+        class_busy[r['class_id']] &= ~old_bit
+        faculty_busy[r['faculty_id']] &= ~old_bit
+        location_busy[r['location_id']] &= ~old_bit
+        current = state['total']
+        remove_placement(state, r)
+
+        for _ in range(MOVE_DRAWS):
+            pos = rng.choice(positions)
+            fac_id = rng.choice(fac_ids)
+            loc_id = rng.choice(loc_ids)
+            bit = 1 << pos
+            if (class_busy[r['class_id']] | faculty_busy[fac_id] | location_busy[loc_id]) & bit:
+                continue
+            tried += 1
+            r.update(slot_id=slot_ids[pos], faculty_id=fac_id, location_id=loc_id)
+            add_placement(state, r)
+            if state['total'] <= current:
+                accepted += 1
+                break
+            remove_placement(state, r)
+            r.update(old)
+        else:
+            r.update(old)
+            add_placement(state, r)
+
+        bit = 1 << state['positions'][r['slot_id']]
+        class_busy[r['class_id']] |= bit
+        faculty_busy[r['faculty_id']] |= bit
+        location_busy[r['location_id']] |= bit
+
+    return {
+        'before': before,
+        'after': state['total'],
+        'terms': dict(state['terms']),
+        'moves_tried': tried,
+        'moves_accepted': accepted
+    }
@@ -0,0 +1,126 @@
+from datetime import datetime
+from sqlalchemy import delete, insert, literal, select, update
+from backend.database import db
+from backend.models import PublishedTimetable, TimetableEntry, TimetableGeneration
+
+# Rows per executemany batch when writing timetable entries.
+INSERT_BATCH_SIZE = 1000
+# Fields written for each generated entry.
+ENTRY_COLUMNS = ('class_id', 'slot_id', 'subject_id', 'faculty_id', 'location_id')
+# Unpublished generations kept by collect_generations, newest first.
+KEEP_GENERATIONS = 5
+# The one row of published_timetable.
+POINTER_ID = 1
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def published_generation_id():
+    """Id of the generation readers see, or None before the first publish."""
+    return db.session.execute(
+        select(PublishedTimetable.generation_id).where(PublishedTimetable.id == POINTER_ID)
+    ).scalar()
+
+def _point_at(generation_id):
+    values = {'generation_id': generation_id, 'published_at': datetime.utcnow()}
+    table = PublishedTimetable.__table__
+    if not db.session.execute(update(table).where(table.c.id == POINTER_ID).values(**values)).rowcount:
+        db.session.execute(insert(table).values(id=POINTER_ID, **values))
+
+def insert_entries(generation_id, results, batch_size=INSERT_BATCH_SIZE):
+    """
+    Adds entries to a generation in the current transaction with Core
+    insert(), one executemany per batch. Does not commit. Returns the rows
+    written.
+    """
+    rows = [dict({key: r[key] for key in ENTRY_COLUMNS}, generation_id=generation_id) for r in results]
+    table = TimetableEntry.__table__
+    for batch in _batches(rows, batch_size):
+        db.session.execute(insert(table), batch)
+    return len(rows)
+
+def _copy_entries(generation_id, entry_ids, batch_size):
+    # INSERT ... SELECT, so kept rows never travel through Python.
+    table = TimetableEntry.__table__
+    columns = ['generation_id', 'lab_batch_info', 'generated_at'] + list(ENTRY_COLUMNS)
+    for batch in _batches(list(entry_ids), batch_size):
+        source = select(literal(generation_id), table.c.lab_batch_info, table.c.generated_at,
+                        *(table.c[key] for key in ENTRY_COLUMNS)).where(table.c.entry_id.in_(batch))
+        db.session.execute(insert(table).from_select(columns, source))
+
+def save_generation(results, publish=True, keep_entry_ids=(), batch_size=INSERT_BATCH_SIZE, **info):
+    """
+    Writes results as a new generation and, if publish, points readers at
+    it, all in one transaction: readers see the old generation until the
+    commit and the new one after it. keep_entry_ids are existing entries
+    copied into the new generation as well (the incremental path). info
+    fills the other TimetableGeneration columns (engine, seed, complete,
+    soft_score). Rolls back and re-raises on failure. Returns the new
+    generation id.
+    """
+    try:
+        generation = TimetableGeneration(entry_count=len(keep_entry_ids) + len(results), **info)
+        db.session.add(generation)
+        db.session.flush()
+        _copy_entries(generation.generation_id, keep_entry_ids, batch_size)
+        insert_entries(generation.generation_id, results, batch_size)
+        if publish:
+            _point_at(generation.generation_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return generation.generation_id
+
+def publish_generation(generation_id):
+    """Points readers at an existing generation (also how a rollback is done).
+    Returns False if there is no such generation."""
+    if db.session.get(TimetableGeneration, generation_id) is None:
+        return False
+    _point_at(generation_id)
+    db.session.commit()
+    return True
+
+def delete_generations(generation_ids, batch_size=INSERT_BATCH_SIZE):
+    """Deletes generations and their entries with one statement per table
+    and batch, in one transaction. The published one is never deleted.
+    Returns how many generations went."""
+    published = published_generation_id()
+    ids = [g for g in generation_ids if g != published]
+    entries = TimetableEntry.__table__
+    generations = TimetableGeneration.__table__
+    dropped = 0
+    try:
+        for batch in _batches(ids, batch_size):
+            db.session.execute(delete(entries).where(entries.c.generation_id.in_(batch)))
+            dropped += db.session.execute(delete(generations).where(generations.c.generation_id.in_(batch))).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return dropped
+
+def collect_generations(keep=KEEP_GENERATIONS):
+    """Drops all but the newest keep unpublished generations. Returns how
+    many were dropped."""
+    published = published_generation_id()
+    ids = db.session.execute(
+        select(TimetableGeneration.generation_id).order_by(TimetableGeneration.generation_id.desc())
+    ).scalars().all()
+    stale = [g for g in ids if g != published][keep:]
+    return delete_generations(stale) if stale else 0
+
+def list_generations():
+    """Every generation, newest first, flagged with whether it is published."""
+    published = published_generation_id()
+    return [{
+        'generation_id': g.generation_id,
+        'created_at': g.created_at.isoformat(),
+        'engine': g.engine,
+        'seed': g.seed,
+        'entry_count': g.entry_count,
+        'complete': g.complete,
+        'soft_score': g.soft_score,
+        'published': g.generation_id == published
+    } for g in TimetableGeneration.query.order_by(TimetableGeneration.generation_id.desc())]
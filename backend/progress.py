@@ -0,0 +1,33 @@
+import time
+
+# Hooks a solver context may carry that only make sense in this process.
+IN_PROCESS_KEYS = ('progress', 'cancel')
+
+def checkpoint(context, placed, backtracks):
+    """
+    Called by the solver engines every few hundred steps.
+
+    Publishes placed/backtracks into context['progress'] when a caller is
+    watching, and returns True when the search must stop: either the
+    context['cancel'] event is set (context['cancelled']) or
+    context['deadline'] has passed (context['timed_out']).
+    """
+    progress = context.get('progress')
+    if progress is not None:
+        progress['placed'] = placed
+        progress['backtracks'] = backtracks
+
+    cancel = context.get('cancel')
+    if cancel is not None and cancel.is_set():
+        context['cancelled'] = True
+        return True
+
+    deadline = context.get('deadline')
+    if deadline is not None and time.monotonic() >= deadline:
+        context['timed_out'] = True
+        return True
+    return False
+
+def picklable(context):
+    """Copy of context without the in-process hooks, for worker processes."""
+    return {key: value for key, value in context.items() if key not in IN_PROCESS_KEYS}
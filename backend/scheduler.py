@@ -1,200 +1,1317 @@
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, url_for
 from backend.database import db
 from backend.models import (
     Class, Subject, Faculty, Location, TimeSlot, ClassSubject, TimetableEntry,
     faculty_subjects
 )
+from backend.eligibility import build_eligibility_index, day_order, eligible_slots, slot_positions
+from backend.feasibility import analyze_feasibility, popcount
+from backend.local_search import solve_timetable_min_conflicts
+from backend.jobs import cancel_job, get_job, submit_job
+from backend.objective import optimize_timetable, score_timetable
+from backend.persistence import (
+    KEEP_GENERATIONS, collect_generations, delete_generations, list_generations, publish_generation, published_generation_id,
+    save_generation
+)
+from backend.progress import checkpoint, picklable
+from backend.solution_cache import get_cached_solution, input_fingerprint, invalidate_solution_cache, store_solution
+from backend.validator import reference_from_data, validate_timetable
+from backend.stats import context_size, count_queries, merge_search_stats, profile_call, search_stats, timed
+from collections import Counter, defaultdict, namedtuple
+from sqlalchemy import select
+import json
+import multiprocessing
+import os
 import random
+import time
 
 scheduler_bp = Blueprint('scheduler', __name__)
 
+# Upper bound on portfolio instances per request; each one pickles a full context.
+MAX_PORTFOLIO_INSTANCES = (os.cpu_count() or 1) * 2
+# Seconds a portfolio or decomposed solve may block its request before giving up.
+PORTFOLIO_TIMEOUT = 120
+# Longest time_budget a generate request may ask for, in seconds.
+MAX_TIME_BUDGET = 600
+# Extra seconds a pool waits past the budget for workers to hand back partials.
+POOL_GRACE_SECONDS = 5
+# How often a waiting pool checks whether its job was cancelled, in seconds.
+POOL_POLL_SECONDS = 0.5
+# Seconds the optimization phase may run when there is no time budget.
+OPTIMIZE_SECONDS = 10
+# Fields every timetable entry carries.
+ENTRY_FIELDS = ('class_id', 'slot_id', 'subject_id', 'faculty_id', 'location_id')
+# Seconds between progress events on a job's event stream.
+EVENT_INTERVAL_SECONDS = 0.5
+# Below this many units, decomposed components are solved in-process.
+DECOMPOSE_PARALLEL_MIN_UNITS = 500
+# Backtracks before the MRV solver restarts; the allowance doubles each time.
+MRV_RESTART_BACKTRACKS = 1000
+
+# Plain stand-in for TimeSlot so solver contexts can cross process boundaries.
+# day and period are only needed by the soft objective.
+SlotInfo = namedtuple('SlotInfo', ['slot_id', 'applicable_year_group', 'day', 'period'], defaults=(None, None))
+# Rows of fetch_scheduling_data_orm, with the column names of their models.
+ClassRow = namedtuple('ClassRow', ['class_id', 'year', 'class_name'])
+SubjectRow = namedtuple('SubjectRow', ['subject_id', 'code', 'is_lab', 'faculty_ids'])
+FacultyRow = namedtuple('FacultyRow', ['faculty_id', 'name'])
+LocationRow = namedtuple('LocationRow', ['location_id', 'is_lab', 'building'])
+TimeSlotRow = namedtuple('TimeSlotRow', ['slot_id', 'applicable_year_group', 'day_of_week', 'period_number'])
+
 def fetch_scheduling_data_orm():
-    """Fetches all necessary data for timetable generation using ORM."""
+    """
+    Fetches all scheduling inputs in one pass of Core selects, one per table
+    (requirements are joined to subjects for is_lab), into plain namedtuples.
+    Nothing is lazy-loaded afterwards, so the number of queries does not
+    depend on the size of the data; it is reported as data['query_count'].
+    """
     data = {}
     try:
-        # We need plain lists or dicts usually for the algorithm, or we can use objects directly.
-        # Using objects directly is cleaner in Python.
-        
-        data['classes'] = Class.query.all()
-        data['subjects'] = {s.subject_id: s for s in Subject.query.all()}
-        data['faculties'] = {f.faculty_id: f for f in Faculty.query.all()}
-        data['locations'] = Location.query.all()
-        
-        # Sort Timeslots
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        all_slots = TimeSlot.query.all()
-        all_slots.sort(key=lambda x: (days.index(x.day_of_week) if x.day_of_week in days else 99, x.period_number))
-        data['timeslots'] = all_slots
-
-        # Requirements
-        # Group by class
-        data['class_subject_requirements'] = {}
-        all_reqs = ClassSubject.query.all()
-        for req in all_reqs:
-            if req.class_id not in data['class_subject_requirements']:
-                data['class_subject_requirements'][req.class_id] = []
-            
-            # (subject_id, hours, is_lab)
-            # Accessing subject via relationship req.subject
-            data['class_subject_requirements'][req.class_id].append(
-                (req.subject_id, req.hours_per_week, req.subject.is_lab)
-            )
+        with count_queries(db.engine) as queries:
+            execute = db.session.execute
+            data['classes'] = [ClassRow(*row) for row in execute(
+                select(Class.class_id, Class.year, Class.class_name).order_by(Class.class_id))]
+
+            faculty_ids = defaultdict(list)
+            for faculty_id, subject_id in execute(
+                    select(faculty_subjects.c.faculty_id, faculty_subjects.c.subject_id)
+                    .order_by(faculty_subjects.c.faculty_id)):
+                faculty_ids[subject_id].append(faculty_id)
+            data['subjects'] = {
+                subject_id: SubjectRow(subject_id, code, is_lab, tuple(faculty_ids[subject_id]))
+                for subject_id, code, is_lab in execute(
+                    select(Subject.subject_id, Subject.code, Subject.is_lab).order_by(Subject.subject_id))
+            }
+            data['faculties'] = {row.faculty_id: row for row in (FacultyRow(*row) for row in execute(
+                select(Faculty.faculty_id, Faculty.name).order_by(Faculty.faculty_id)))}
+            data['locations'] = [LocationRow(*row) for row in execute(
+                select(Location.location_id, Location.is_lab, Location.building).order_by(Location.location_id))]
 
+            # Sort Timeslots
+            all_slots = [TimeSlotRow(*row) for row in execute(
+                select(TimeSlot.slot_id, TimeSlot.applicable_year_group, TimeSlot.day_of_week,
+                       TimeSlot.period_number).order_by(TimeSlot.slot_id))]
+            all_slots.sort(key=lambda x: (day_order(x.day_of_week), x.period_number))
+            data['timeslots'] = all_slots
+
+            # Requirements grouped by class: (subject_id, hours, is_lab)
+            data['class_subject_requirements'] = {}
+            for class_id, subject_id, hours, is_lab in execute(
+                    select(ClassSubject.class_id, ClassSubject.subject_id, ClassSubject.hours_per_week, Subject.is_lab)
+                    .join(Subject, Subject.subject_id == ClassSubject.subject_id)
+                    .order_by(ClassSubject.class_subject_id)):
+                data['class_subject_requirements'].setdefault(class_id, []).append((subject_id, hours, is_lab))
+
+        data['query_count'] = queries['count']
         return data
 
     except Exception as e:
         print(f"Error fetching scheduling data: {e}")
         return None
 
-def solve_timetable_backtracking(assignments_needed, context):
+def build_assignments(data):
+    """Expands class requirements into one unit per weekly lecture hour."""
+    classes = {c.class_id: c for c in data['classes']}
+    assignments_needed = []
+    for cls_id, reqs in data['class_subject_requirements'].items():
+        cls_info = classes.get(cls_id)
+        if not cls_info: continue
+        
+        for subject_id, hours, is_lab in reqs:
+            for _ in range(hours):
+                assignments_needed.append({
+                    'class_id': cls_id,
+                    'subject_id': subject_id,
+                    'is_lab': is_lab,
+                    'year': cls_info.year
+                })
+    return assignments_needed
+
+def order_assignments(assignments_needed, rng):
+    """Shuffles units in place with rng, then moves labs to the front."""
+    rng.shuffle(assignments_needed)
+    assignments_needed.sort(key=lambda x: x['is_lab'], reverse=True)
+
+def build_solver_context(data, rng):
     """
-    Backtracking solver.
-    Args:
-        assignments_needed: List of dicts representing tasks.
-        context: Dictionaries for fast lookups and state tracking.
+    Solver inputs as plain ids and lists, so the search never touches the ORM
+    and the context can be pickled to worker processes. All random choices
+    during the search are drawn from rng.
     """
-    if not assignments_needed:
-        return True
+    timeslots = [SlotInfo(s.slot_id, s.applicable_year_group, s.day_of_week, s.period_number)
+                 for s in data['timeslots']]
+    return {
+        'rng': rng,
+        'timeslots': timeslots,
+        'eligibility': build_eligibility_index(timeslots, {'year': {c.year for c in data['classes']}}),
+        'subject_faculty': {
+            subject_id: list(subject.faculty_ids)
+            for subject_id, subject in data['subjects'].items()
+        },
+        'lecture_rooms': [loc.location_id for loc in data['locations'] if not loc.is_lab],
+        'lab_rooms': [loc.location_id for loc in data['locations'] if loc.is_lab],
+        'location_building': {loc.location_id: loc.building for loc in data['locations']},
+        'class_schedule': defaultdict(int),
+        'faculty_schedule': defaultdict(int),
+        'location_schedule': defaultdict(int),
+        'results': []
+    }
 
-    current_assignment = assignments_needed[0]
-    remaining_assignments = assignments_needed[1:]
+def record_assignments(context, results):
+    """Marks already-decided placements as occupied and appends them to the results."""
+    positions = {slot.slot_id: pos for pos, slot in enumerate(context['timeslots'])}
+    for r in results:
+        bit = 1 << positions[r['slot_id']]
+        context['class_schedule'][r['class_id']] |= bit
+        context['faculty_schedule'][r['faculty_id']] |= bit
+        context['location_schedule'][r['location_id']] |= bit
+    context['results'].extend(results)
 
-    cls_id = current_assignment['class_id']
-    subject_id = current_assignment['subject_id']
-    is_lab = current_assignment['is_lab']
-    cls_year = current_assignment['year']
+def _unit_candidates(unit, context):
+    """
+    Yields (bit, slot_id, faculty_id, location_id) placements for one unit
+    in the order the solver tries them. Occupancy is checked lazily, so each
+    candidate reflects the schedule as it stands when it is drawn. Warm-start
+    hints for the unit's class and subject (context['hints']) come first.
+    """
+    cls_id = unit['class_id']
+    subject_id = unit['subject_id']
+    is_lab = unit['is_lab']
 
     # Get Candidates
-    # Faculty ID list for this subject.
-    # In ORM: Subject.faculties gives list of Faculty objects.
-    subject_obj = context['subjects_map'].get(subject_id)
-    possible_faculty_ids = [f.faculty_id for f in subject_obj.faculties] if subject_obj else []
+    possible_faculty_ids = list(context['subject_faculty'].get(subject_id, ()))
     
     possible_locations = context['lab_rooms'] if is_lab else context['lecture_rooms']
     
-    random.shuffle(possible_faculty_ids)
-    random.shuffle(possible_locations)
-    
-    for slot in context['timeslots']:
-        slot_id = slot.slot_id
-        
-        # Check Year Group validity
-        if slot.applicable_year_group != 'ALL':
-            if slot.applicable_year_group == '1' and cls_year != 1: continue
-            if slot.applicable_year_group == '2-3+' and cls_year < 2: continue
+    context['rng'].shuffle(possible_faculty_ids)
+    context['rng'].shuffle(possible_locations)
+
+    # Occupancy is one int per class/faculty/location; bit N set means the
+    # Nth entry of context['timeslots'] is taken.
+    class_busy = context['class_schedule']
+    faculty_busy = context['faculty_schedule']
+    location_busy = context['location_schedule']
+    timeslots = context['timeslots']
+
+    # A hint only counts while its teacher and room are still this unit's to use.
+    hints = [(pos, fac_id, loc_id) for pos, fac_id, loc_id in context.get('hints', {}).get((cls_id, subject_id), ())
+             if fac_id in possible_faculty_ids and loc_id in possible_locations]
+    for pos, fac_id, loc_id in hints:
+        bit = 1 << pos
+        if not (class_busy[cls_id] | faculty_busy[fac_id] | location_busy[loc_id]) & bit:
+            yield bit, timeslots[pos].slot_id, fac_id, loc_id
+
+    # Only the slots the unit's year group (and any other slot rule) admits.
+    for pos in slot_positions(context, eligible_slots(context, unit)):
+        bit = 1 << pos
+        slot = timeslots[pos]
 
         # Conflict Checks
-        if context['class_schedule'].get((cls_id, slot_id)): continue
+        if class_busy[cls_id] & bit: continue
         
         for fac_id in possible_faculty_ids:
-            if context['faculty_schedule'].get((fac_id, slot_id)): continue
+            if faculty_busy[fac_id] & bit: continue
             
-            for loc in possible_locations:
-                loc_id = loc.location_id
-                if context['location_schedule'].get((loc_id, slot_id)): continue
-                
-                # Assign
-                context['class_schedule'][(cls_id, slot_id)] = True
-                context['faculty_schedule'][(fac_id, slot_id)] = True
-                context['location_schedule'][(loc_id, slot_id)] = True
-                
-                context['results'].append({
-                    'class_id': cls_id, 'slot_id': slot_id, 'subject_id': subject_id,
-                    'faculty_id': fac_id, 'location_id': loc_id
-                })
-                
-                if solve_timetable_backtracking(remaining_assignments, context):
-                    return True
-                
+            for loc_id in possible_locations:
+                if location_busy[loc_id] & bit: continue
+                if hints and (pos, fac_id, loc_id) in hints: continue
+
+                yield bit, slot.slot_id, fac_id, loc_id
+
+def solve_timetable_backtracking(assignments_needed, context):
+    """
+    Backtracking solver.
+    Args:
+        assignments_needed: List of dicts representing tasks.
+        context: Dictionaries for fast lookups and state tracking.
+
+    Depth-first search driven by an explicit stack with one candidate
+    generator per placed unit, so long unit lists neither copy the list
+    per level nor hit Python's recursion limit.
+
+    Every 256 steps it calls backend.progress.checkpoint, which publishes
+    progress and stops the search (returning False) once context['deadline']
+    passes or context['cancel'] is set. Whenever it fails,
+    context['best_results'] holds the deepest partial timetable found.
+    Search counters are added to context['stats'] (see backend.stats).
+    """
+    class_busy = context['class_schedule']
+    faculty_busy = context['faculty_schedule']
+    location_busy = context['location_schedule']
+    results = context['results']
+    best = context['best_results'] = []
+
+    total = len(assignments_needed)
+    frames = []  # candidate generator for each depth
+    trail = []   # (bit, class_id, faculty_id, location_id) placed at each depth
+    depth = 0
+    steps = 0
+    backtracks = 0
+    nodes = 0
+    tried = 0
+    stats = search_stats(context)
+    by_depth = stats['backtracks_by_depth']
+
+    try:
+        while depth < total:
+            steps += 1
+            if not steps & 255 and checkpoint(context, depth, backtracks):
+                if len(results) > len(best):
+                    context['best_results'] = list(results)
+                return False
+
+            unit = assignments_needed[depth]
+            if len(frames) == depth:
+                frames.append(_unit_candidates(unit, context))
+                nodes += 1
+
+            candidate = next(frames[-1], None)
+            if candidate is None:
+                # The deepest point of a branch is always just before a backtrack.
+                if len(results) > len(best):
+                    best = context['best_results'] = list(results)
+                frames.pop()
+                if not frames:
+                    return False
+                depth -= 1
+                backtracks += 1
+                by_depth[depth] += 1
+
                 # Backtrack
-                context['class_schedule'].pop((cls_id, slot_id), None)
-                context['faculty_schedule'].pop((fac_id, slot_id), None)
-                context['location_schedule'].pop((loc_id, slot_id), None)
-                context['results'].pop()
+                bit, cls_id, fac_id, loc_id = trail.pop()
+                class_busy[cls_id] &= ~bit
+                faculty_busy[fac_id] &= ~bit
+                location_busy[loc_id] &= ~bit
+                results.pop()
+                continue
+
+            # Assign
+            tried += 1
+            bit, slot_id, fac_id, loc_id = candidate
+            cls_id = unit['class_id']
+            class_busy[cls_id] |= bit
+            faculty_busy[fac_id] |= bit
+            location_busy[loc_id] |= bit
+            trail.append((bit, cls_id, fac_id, loc_id))
+
+            results.append({
+                'class_id': cls_id, 'slot_id': slot_id, 'subject_id': unit['subject_id'],
+                'faculty_id': fac_id, 'location_id': loc_id
+            })
+            depth += 1
+
+        context['best_results'] = results
+        return True
+    finally:
+        stats['nodes'] += nodes
+        stats['candidates_tried'] += tried
+        stats['backtracks'] += backtracks
+        stats['peak_depth'] = max(stats['peak_depth'], len(context['best_results']))
+
+def solve_timetable_mrv(assignments_needed, context):
+    """
+    Backtracking solver with MRV ordering and forward checking.
+
+    Units of the same class and subject are interchangeable, so they are
+    grouped and each group keeps a live domain: the slots at which its class,
+    at least one of the subject's faculty and at least one room of the right
+    kind are still free. Feasible (slot, faculty, room) triples are drawn from
+    that domain when the group is expanded. The group with the fewest options
+    per pending unit goes next, ties going to the group whose faculty have
+    the fewest free slots. After each placement the domains of every group
+    sharing the class or faculty (or the room kind, once it is full at that
+    slot) are re-derived, and the placement is undone as soon as one of them
+    can no longer fit its pending units.
+
+    A group places its units in increasing slot order (its floor), read
+    cyclically from a random offset per group, so the groups spread over
+    the week instead of all packing the first slots. After
+    MRV_RESTART_BACKTRACKS backtracks (doubling each time) the search starts
+    over with new offsets; running out of candidates still proves the input
+    infeasible.
+
+    Checkpoints, fills context['best_results'], counts into
+    context['stats'] and tries context['hints'] first the same way
+    solve_timetable_backtracking does.
+    """
+    timeslots = context['timeslots']
+    class_busy = context['class_schedule']
+    faculty_busy = context['faculty_schedule']
+    location_busy = context['location_schedule']
+    results = context['results']
+    rng = context['rng']
+    best = context['best_results'] = []
+    all_slots = (1 << len(timeslots)) - 1
+
+    # Group state, indexed by group number.
+    group_of = {}
+    g_class, g_subject, g_is_lab, g_faculty, g_eligible = [], [], [], [], []
+    pending, floor, domain, size, offset = [], [], [], [], []
+    by_class, by_faculty, by_kind = defaultdict(list), defaultdict(list), defaultdict(list)
+
+    for unit in assignments_needed:
+        key = (unit['class_id'], unit['subject_id'])
+        g = group_of.get(key)
+        if g is None:
+            g = group_of[key] = len(g_class)
+            fac_ids = context['subject_faculty'].get(unit['subject_id'], [])
+
+            g_class.append(unit['class_id'])
+            g_subject.append(unit['subject_id'])
+            g_is_lab.append(bool(unit['is_lab']))
+            g_faculty.append(fac_ids)
+            g_eligible.append(eligible_slots(context, unit))
+            pending.append(0)
+            floor.append(0)
+            domain.append(0)
+            size.append(0)
+            offset.append(rng.randrange(len(timeslots)) if timeslots else 0)
+            by_class[unit['class_id']].append(g)
+            for fac_id in fac_ids:
+                by_faculty[fac_id].append(g)
+            by_kind[bool(unit['is_lab'])].append(g)
+        pending[g] += 1
+
+    rooms = {True: context['lab_rooms'], False: context['lecture_rooms']}
+    # Slots at which every room of a kind is taken.
+    kind_full = {}
+    for kind, loc_ids in rooms.items():
+        full = all_slots
+        for loc_id in loc_ids:
+            full &= location_busy[loc_id]
+        kind_full[kind] = full
+
+    def faculty_blocked(g):
+        blocked = all_slots
+        for fac_id in g_faculty[g]:
+            blocked &= faculty_busy[fac_id]
+        return blocked
+
+    def derive_domain(g):
+        return (g_eligible[g] & ~class_busy[g_class[g]] & ~floor[g]
+                & ~faculty_blocked(g) & ~kind_full[g_is_lab[g]])
+
+    for g in range(len(g_class)):
+        domain[g] = derive_domain(g)
+        size[g] = popcount(domain[g])
+        if size[g] < pending[g]:
+            return False
+
+    def select_group():
+        best, best_slack = [], None
+        for g in range(len(g_class)):
+            if not pending[g]:
+                continue
+            slack = size[g] - pending[g]
+            if best_slack is None or slack < best_slack:
+                best, best_slack = [g], slack
+            elif slack == best_slack:
+                best.append(g)
+        if len(best) == 1:
+            return best[0]
+        return min(best, key=lambda g: popcount(all_slots & ~faculty_blocked(g)))
+
+    def rotated(g, options):
+        """The slots of options from the group's offset upwards, then the ones below it."""
+        below = (1 << offset[g]) - 1
+        for part in (options & ~below, options & below):
+            while part:
+                bit = part & -part
+                part ^= bit
+                yield bit
+
+    def through(g, bit):
+        """The slots up to and including bit in the group's rotated order."""
+        below = (1 << offset[g]) - 1
+        if bit > below:
+            return ((bit << 1) - 1) & ~below
+        return ((bit << 1) - 1) | (all_slots & ~below)
+
+    hints = context.get('hints', {})
+
+    def candidates(g):
+        fac_ids = list(g_faculty[g])
+        loc_ids = list(rooms[g_is_lab[g]])
+        rng.shuffle(fac_ids)
+        rng.shuffle(loc_ids)
+        cls_id = g_class[g]
+        # Warm-start hints first, in the group's slot order so the floor keeps them.
+        hinted = sorted(((1 << pos, fac_id, loc_id)
+                         for pos, fac_id, loc_id in hints.get((cls_id, g_subject[g]), ())
+                         if fac_id in fac_ids and loc_id in loc_ids),
+                        key=lambda h: (h[0].bit_length() - 1 - offset[g]) % len(timeslots))
+        for bit, fac_id, loc_id in hinted:
+            if domain[g] & bit and not (class_busy[cls_id] | faculty_busy[fac_id] | location_busy[loc_id]) & bit:
+                yield bit, fac_id, loc_id
+        for bit in rotated(g, domain[g]):
+            if class_busy[cls_id] & bit: continue
+            for fac_id in fac_ids:
+                if faculty_busy[fac_id] & bit: continue
+                for loc_id in loc_ids:
+                    if location_busy[loc_id] & bit: continue
+                    if hinted and (bit, fac_id, loc_id) in hinted: continue
+                    yield bit, fac_id, loc_id
+
+    slot_ids = [slot.slot_id for slot in timeslots]
+    domain_trail = []  # (group, previous domain, previous size)
+    placed = []        # undo record per depth
+
+    def place(g, bit, fac_id, loc_id):
+        cls_id, kind = g_class[g], g_is_lab[g]
+        class_busy[cls_id] |= bit
+        faculty_busy[fac_id] |= bit
+        location_busy[loc_id] |= bit
+        became_full = not kind_full[kind] & bit and all(location_busy[l] & bit for l in rooms[kind])
+        if became_full:
+            kind_full[kind] |= bit
+        placed.append((g, bit, fac_id, loc_id, floor[g], became_full, len(domain_trail)))
+        pending[g] -= 1
+        floor[g] = through(g, bit)
+        results.append({
+            'class_id': cls_id, 'slot_id': slot_ids[bit.bit_length() - 1],
+            'subject_id': g_subject[g], 'faculty_id': fac_id, 'location_id': loc_id
+        })
+
+        # Forward check
+        neighbours = set(by_class[cls_id])
+        neighbours.update(by_faculty[fac_id])
+        if became_full:
+            neighbours.update(by_kind[kind])
+        for h in neighbours:
+            if not pending[h]:
+                continue
+            domain_trail.append((h, domain[h], size[h]))
+            domain[h] = derive_domain(h)
+            size[h] = popcount(domain[h])
+            if size[h] < pending[h]:
+                return False
+        return True
+
+    def unplace():
+        g, bit, fac_id, loc_id, old_floor, became_full, mark = placed.pop()
+        while len(domain_trail) > mark:
+            h, domain[h], size[h] = domain_trail.pop()
+        class_busy[g_class[g]] &= ~bit
+        faculty_busy[fac_id] &= ~bit
+        location_busy[loc_id] &= ~bit
+        if became_full:
+            kind_full[g_is_lab[g]] &= ~bit
+        pending[g] += 1
+        floor[g] = old_floor
+        results.pop()
+
+    remaining = len(assignments_needed)
+    frames = []
+    steps = 0
+    restart_limit = restart_at = MRV_RESTART_BACKTRACKS
+    backtracks = 0
+    nodes = 0
+    tried = 0
+    stats = search_stats(context)
+    by_depth = stats['backtracks_by_depth']
+
+    try:
+        while remaining:
+            steps += 1
+            if not steps & 255 and checkpoint(context, len(results), backtracks):
+                if len(results) > len(best):
+                    context['best_results'] = list(results)
+                return False
+
+            if backtracks >= restart_at:
+                if len(results) > len(best):
+                    best = context['best_results'] = list(results)
+                while placed:
+                    unplace()
+                frames.clear()
+                remaining = len(assignments_needed)
+                offset[:] = [rng.randrange(len(timeslots)) for _ in offset]
+                restart_limit *= 2
+                restart_at = backtracks + restart_limit
+
+            if len(frames) == len(placed):
+                g = select_group()
+                frames.append((g, candidates(g)))
+                nodes += 1
+            g, gen = frames[-1]
+
+            for bit, fac_id, loc_id in gen:
+                tried += 1
+                if place(g, bit, fac_id, loc_id):
+                    remaining -= 1
+                    break
+                unplace()
+                backtracks += 1
+                by_depth[len(placed)] += 1
+            else:
+                if len(results) > len(best):
+                    best = context['best_results'] = list(results)
+                frames.pop()
+                if not frames:
+                    return False
+                unplace()
+                backtracks += 1
+                by_depth[len(placed)] += 1
+                remaining += 1
+
+        context['best_results'] = results
+        return True
+    finally:
+        stats['nodes'] += nodes
+        stats['candidates_tried'] += tried
+        stats['backtracks'] += backtracks
+        stats['peak_depth'] = max(stats['peak_depth'], len(context['best_results']))
+
+SOLVERS = {
+    'backtracking': solve_timetable_backtracking,
+    'mrv': solve_timetable_mrv,
+    'min_conflicts': solve_timetable_min_conflicts,
+}
+
+def _portfolio_worker(job):
+    engine, seed, reorder, assignments_needed, context = job
+    context['rng'] = random.Random(seed)
+    if reorder:
+        order_assignments(assignments_needed, context['rng'])
+    success = SOLVERS[engine](assignments_needed, context)
+    return success, context['results'] if success else context.get('best_results', []), context.get('stats')
+
+def _await_pool(fetch, context, deadline):
+    """
+    Calls fetch(timeout) in short rounds so that a cancelled job is noticed
+    while workers run. Returns the fetched value, or None once the job is
+    cancelled or the deadline passes.
+    """
+    while True:
+        cancel = context.get('cancel')
+        if cancel is not None and cancel.is_set():
+            context['cancelled'] = True
+            return None
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            context['timed_out'] = True
+            return None
+        try:
+            return fetch(POOL_POLL_SECONDS if remaining is None else min(remaining, POOL_POLL_SECONDS))
+        except multiprocessing.TimeoutError:
+            continue
+
+def solve_portfolio(assignments_needed, context, engine='backtracking', instances=4, timeout=None):
+    """
+    Runs several independently seeded solver instances on a process pool and
+    keeps the first complete solution, terminating the rest. Instance 0
+    searches assignments_needed in the given order; the others reshuffle it.
+    Instance seeds come from context['rng'].
+
+    The call blocks until an instance succeeds, all of them fail, or timeout
+    seconds pass (None waits for the slowest search) or context['cancel']
+    is set. Workers are started
+    with 'spawn' so they never inherit the server's threads or DB connections.
+    Instances honour context['deadline']; on failure the deepest partial they
+    returned is left in context['best_results']. context['stats'] sums the
+    instances that finished.
+    """
+    seeds = [context['rng'].randrange(2 ** 32) for _ in range(instances)]
+    worker_context = dict(picklable(context), stats=None)
+    stats = search_stats(context)
+    jobs = [(engine, seed, i > 0, list(assignments_needed), worker_context) for i, seed in enumerate(seeds)]
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    context['best_results'] = []
+    pool = multiprocessing.get_context('spawn').Pool(min(instances, os.cpu_count() or 1))
+    try:
+        outcomes = pool.imap_unordered(_portfolio_worker, jobs)
+        for _ in jobs:
+            outcome = _await_pool(outcomes.next, context, deadline)
+            if outcome is None:
+                print("Portfolio stopped before any instance finished.")
+                return False
+            success, results, worker_stats = outcome
+            merge_search_stats(stats, worker_stats)
+            if success:
+                record_assignments(context, results)
+                context['best_results'] = context['results']
+                return True
+            if len(results) > len(context['best_results']):
+                context['best_results'] = results
+        return False
+    finally:
+        pool.terminate()
+        pool.join()
+
+def decompose_assignments(assignments_needed, context):
+    """
+    Splits the units into sub-problems that can be solved independently.
+
+    Classes are linked when they share a candidate faculty, and each
+    connected component becomes one sub-problem. Rooms are the only other
+    shared resource, so each kind of room is dealt out between components:
+    every component first gets enough rooms for its hours over all slots,
+    then the remaining rooms go out in proportion to demand. Returns a list
+    of (units, sub_context) pairs, or a single pair with the whole problem
+    when it does not split or the rooms cannot be divided.
+    """
+    parent = {}
+
+    def find(node):
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for unit in assignments_needed:
+        cls_node = ('class', unit['class_id'])
+        for fac_id in context['subject_faculty'].get(unit['subject_id'], ()):
+            parent[find(cls_node)] = find(('faculty', fac_id))
+        find(cls_node)
+
+    components = defaultdict(list)
+    for unit in assignments_needed:
+        components[find(('class', unit['class_id']))].append(unit)
+    components = sorted(components.values(), key=len, reverse=True)
+    if len(components) < 2:
+        return [(assignments_needed, context)]
+
+    n_slots = len(context['timeslots'])
+    room_shares = [{} for _ in components]
+    for is_lab, key in ((True, 'lab_rooms'), (False, 'lecture_rooms')):
+        rooms = list(context[key])
+        demand = [sum(1 for u in units if bool(u['is_lab']) == is_lab) for units in components]
+        minimum = [-(-d // n_slots) if n_slots else len(rooms) for d in demand]
+        if sum(minimum) > len(rooms):
+            return [(assignments_needed, context)]
+        counts = list(minimum)
+        spare = len(rooms) - sum(minimum)
+        total = sum(demand)
+        if total:
+            for i, d in enumerate(demand):
+                counts[i] += spare * d // total
+            # Rounding leftovers go to the busiest components.
+            leftover = len(rooms) - sum(counts)
+            for i in sorted(range(len(components)), key=lambda i: demand[i], reverse=True)[:leftover]:
+                counts[i] += 1
+        start = 0
+        for i, count in enumerate(counts):
+            room_shares[i][key] = rooms[start:start + count]
+            start += count
+
+    hints = context.get('hints', {})
+    parts = []
+    for units, shares in zip(components, room_shares):
+        # Each component only keeps the hints that fall in its own rooms.
+        own_rooms = set(shares['lecture_rooms']) | set(shares['lab_rooms'])
+        own_units = {(u['class_id'], u['subject_id']) for u in units}
+        sub_hints = {key: [h for h in hints[key] if h[2] in own_rooms] for key in own_units if key in hints}
+        sub_context = dict(
+            context,
+            rng=random.Random(context['rng'].randrange(2 ** 32)),
+            lecture_rooms=shares['lecture_rooms'],
+            lab_rooms=shares['lab_rooms'],
+            class_schedule=defaultdict(int),
+            faculty_schedule=defaultdict(int),
+            location_schedule=defaultdict(int),
+            results=[],
+            hints=sub_hints,
+            stats=None
+        )
+        parts.append((units, sub_context))
+    return parts
+
+def _component_worker(job):
+    engine, units, context = job
+    success = SOLVERS[engine](units, context)
+    return success, context['results'] if success else context.get('best_results', []), context.get('stats')
+
+def solve_decomposed(assignments_needed, context, engine='backtracking', timeout=None):
+    """
+    Solves each independent sub-problem from decompose_assignments and merges
+    the results into context. Large splits run on a spawn-started process
+    pool; small ones run in-process. If any component fails, its room share
+    may have been too tight, so the whole problem is solved jointly instead;
+    if that fails too, the better of the two partials is kept.
+    """
+    parts = decompose_assignments(assignments_needed, context)
+    if len(parts) == 1:
+        return SOLVERS[engine](assignments_needed, context)
+    print(f"Decomposed into {len(parts)} independent sub-problems.")
+
+    jobs = [(engine, units, picklable(sub_context)) for units, sub_context in parts]
+    processes = min(len(jobs), os.cpu_count() or 1)
+    if processes > 1 and len(assignments_needed) >= DECOMPOSE_PARALLEL_MIN_UNITS:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        pool = multiprocessing.get_context('spawn').Pool(processes)
+        try:
+            outcomes = _await_pool(pool.map_async(_component_worker, jobs).get, context, deadline)
+            if outcomes is None:
+                print("Decomposed solve stopped before all components finished.")
+                context['best_results'] = []
+                return False
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        outcomes = [_component_worker(job) for job in jobs]
+
+    stats = search_stats(context)
+    for _, _, component_stats in outcomes:
+        merge_search_stats(stats, component_stats)
 
+    if all(success for success, _, _ in outcomes):
+        for _, results, _ in outcomes:
+            record_assignments(context, results)
+        context['best_results'] = context['results']
+        return True
+
+    # Components are independent, so their partial timetables combine.
+    partial = [r for _, results, _ in outcomes for r in results]
+    print("A component failed with its room share; solving jointly.")
+    if SOLVERS[engine](assignments_needed, context):
+        return True
+    if len(partial) > len(context.get('best_results', [])):
+        context['best_results'] = partial
     return False
 
-@scheduler_bp.route('/generate-timetable', methods=['POST'])
-def generate_timetable():
-    print("Received request to generate timetable (ORM Backtracking).")
+def plan_incremental(assignments_needed, context, entries):
+    """
+    Diffs stored timetable entries against the current requirements.
+
+    An entry is kept while its class still needs that subject, its slot is
+    eligible for the class's year, its faculty is still mapped to the subject,
+    its room is of the right kind, and it does not clash with entries kept
+    before it. Each (class, subject) keeps at most the hours it now needs.
+    Returns (kept, missing): the surviving entries and the units still to place.
+    """
+    positions = {slot.slot_id: pos for pos, slot in enumerate(context['timeslots'])}
+    needed = Counter((u['class_id'], u['subject_id']) for u in assignments_needed)
+    units_by_key = defaultdict(list)
+    for unit in assignments_needed:
+        units_by_key[(unit['class_id'], unit['subject_id'])].append(unit)
+    rooms = {True: set(context['lab_rooms']), False: set(context['lecture_rooms'])}
+    taken = set()
+    kept = []
+
+    for entry in entries:
+        key = (entry['class_id'], entry['subject_id'])
+        pos = positions.get(entry['slot_id'])
+        if not needed[key] or pos is None:
+            continue
+        unit = units_by_key[key][0]
+        cells = (('class', entry['class_id'], pos), ('faculty', entry['faculty_id'], pos),
+                 ('room', entry['location_id'], pos))
+        if not eligible_slots(context, unit) >> pos & 1 \
+                or entry['faculty_id'] not in context['subject_faculty'].get(entry['subject_id'], ()) \
+                or entry['location_id'] not in rooms[bool(unit['is_lab'])] \
+                or taken.intersection(cells):
+            continue
+        taken.update(cells)
+        needed[key] -= 1
+        kept.append(entry)
+
+    missing = []
+    for key, hours in needed.items():
+        missing.extend(units_by_key[key][:hours])
+    return kept, missing
+
+def warm_start_hints(assignments_needed, context, entries):
+    """
+    Previous placements for the solvers to try first, as
+    {(class_id, subject_id): [(slot position, faculty_id, location_id)]}.
+    Only the entries plan_incremental would keep are used, so every hint is
+    still valid and no two hints clash.
+    """
+    kept, _ = plan_incremental(assignments_needed, context, entries)
+    positions = {slot.slot_id: pos for pos, slot in enumerate(context['timeslots'])}
+    hints = defaultdict(list)
+    for e in kept:
+        hints[(e['class_id'], e['subject_id'])].append((positions[e['slot_id']], e['faculty_id'], e['location_id']))
+    return dict(hints)
+
+def count_unchanged(previous, results):
+    """How many placements in results also appear in the previous entries."""
+    def placement(r):
+        return (r['class_id'], r['slot_id'], r['subject_id'], r['faculty_id'], r['location_id'])
+    same = Counter(placement(r) for r in previous) & Counter(placement(r) for r in results)
+    return sum(same.values())
+
+def solve_incremental(assignments_needed, context, entries, engine='backtracking'):
+    """
+    Re-solves only what changed since entries were generated.
+
+    The missing units from plan_incremental are first placed around every
+    kept entry. If that fails, the neighbourhood is widened step by step:
+    the kept entries of the affected classes are released, then those of
+    every faculty who could teach the missing subjects, and finally all of
+    them. Returns (success, fixed, new): the kept entries left untouched
+    and the fresh placements.
+    """
+    kept, missing = plan_incremental(assignments_needed, context, entries)
+    print(f"Incremental: keeping {len(kept)} entries, {len(missing)} units to place.")
+    units_by_key = {(u['class_id'], u['subject_id']): u for u in assignments_needed}
+    classes = {u['class_id'] for u in missing}
+    faculties = {f for u in missing for f in context['subject_faculty'].get(u['subject_id'], ())}
+    neighbourhoods = [
+        lambda e: False,
+        lambda e: e['class_id'] in classes,
+        lambda e: e['class_id'] in classes or e['faculty_id'] in faculties,
+        lambda e: True,
+    ]
+    # Attempts copy the context, so they all count into this one dict.
+    search_stats(context)
+
+    for release in neighbourhoods:
+        fixed = [e for e in kept if not release(e)]
+        units = missing + [units_by_key[(e['class_id'], e['subject_id'])] for e in kept if release(e)]
+        attempt = dict(
+            context,
+            class_schedule=defaultdict(int),
+            faculty_schedule=defaultdict(int),
+            location_schedule=defaultdict(int),
+            results=[]
+        )
+        record_assignments(attempt, fixed)
+        if not units or SOLVERS[engine](units, attempt):
+            context.update(attempt)
+            return True, fixed, attempt['results'][len(fixed):]
+        # checkpoint flags the attempt; the caller reads the context.
+        context['timed_out'] = bool(attempt.get('timed_out'))
+        context['cancelled'] = bool(attempt.get('cancelled'))
+        if context['timed_out'] or context['cancelled']:
+            break
+        print(f"Incremental: widening after {len(units)} units failed.")
+    return False, [], []
+
+def summarize_unplaced(assignments_needed, results):
+    """Per (class, subject) count of units that results does not place."""
+    missing = Counter((u['class_id'], u['subject_id']) for u in assignments_needed)
+    missing.subtract((r['class_id'], r['subject_id']) for r in results)
+    return [
+        {'class_id': cls_id, 'subject_id': subject_id, 'hours_missing': hours}
+        for (cls_id, subject_id), hours in sorted(missing.items()) if hours > 0
+    ]
+
+def parse_generate_options(options):
+    """
+    Validates the JSON body of a generate request.
+    Returns (settings, None) or (None, error message).
+    """
+    engine = options.get('engine', 'backtracking')
+    if engine not in SOLVERS:
+        return None, f'Unknown engine "{engine}". Choose one of: {", ".join(SOLVERS)}'
+
+    instances = options.get('portfolio', 1)
+    if not isinstance(instances, int) or isinstance(instances, bool) \
+            or not 1 <= instances <= MAX_PORTFOLIO_INSTANCES:
+        return None, f'portfolio must be a whole number from 1 to {MAX_PORTFOLIO_INSTANCES}'
+
+    seed = options.get('seed')
+    if seed is not None and (not isinstance(seed, (int, str)) or isinstance(seed, bool)):
+        return None, 'seed must be an integer or a string'
+
+    decompose = bool(options.get('decompose', False))
+    incremental = bool(options.get('incremental', False))
+    if sum([instances > 1, decompose, incremental]) > 1:
+        return None, 'Choose only one of portfolio, decompose or incremental'
+
+    time_budget = options.get('time_budget')
+    if time_budget is not None and (not isinstance(time_budget, (int, float)) or isinstance(time_budget, bool)
+                                    or not 0 < time_budget <= MAX_TIME_BUDGET):
+        return None, f'time_budget must be a number of seconds from 0 to {MAX_TIME_BUDGET}'
+
+    return {
+        'engine': engine,
+        'portfolio': instances,
+        'seed': seed,
+        'decompose': decompose,
+        'incremental': incremental,
+        'time_budget': time_budget,
+        'persist_partial': bool(options.get('persist_partial', False)),
+        'wait': bool(options.get('wait', False)),
+        'profile': bool(options.get('profile', False)),
+        'cache': bool(options.get('cache', True)),
+        'warm_start': bool(options.get('warm_start', True)),
+        'optimize': bool(options.get('optimize', False)),
+        'publish': bool(options.get('publish', True)),
+    }, None
+
+def _attach_hooks(context, settings, progress, cancel):
+    """Wires the time budget and the job's progress/cancel hooks into a solver context."""
+    if settings['time_budget']:
+        context['deadline'] = time.monotonic() + settings['time_budget']
+    if progress is not None:
+        context['progress'] = progress
+    if cancel is not None:
+        context['cancel'] = cancel
+
+def run_generation(settings, progress=None, cancel=None):
+    """
+    Generates and saves a timetable as described by parse_generate_options
+    settings. progress (a dict) and cancel (a threading.Event) are optional
+    hooks for background jobs. Returns (payload, http_status).
+
+    Successful payloads carry 'stats': search counters, seconds per phase
+    and the size of the solver context. With settings['profile'] the run
+    is wrapped in cProfile and the report comes back as 'profile'.
+
+    Complete timetables are cached under a hash of the inputs and the
+    solve settings (backend.solution_cache); a repeat request with nothing
+    changed reuses the cached timetable without searching ('cached'), and
+    when the published generation already holds it, returns that
+    generation instead of saving a copy. Pass "cache": false to force a
+    fresh solve. Unless "warm_start" is
+    false, the stored timetable seeds the search as value-ordering hints
+    and 'unchanged_entries' counts the placements that survived. With
+    "optimize": true a complete timetable is improved on the soft
+    objective (backend.objective) for the rest of the time budget or
+    OPTIMIZE_SECONDS; 'soft_score' reports the result either way.
+    """
+    if progress is None:
+        progress = {}
+    if not settings.get('profile'):
+        return _run_generation(settings, progress, cancel)
+    (payload, status), report = profile_call(_run_generation, settings, progress, cancel)
+    payload['profile'] = report
+    return payload, status
+
+def _solve_stats(context, units, timings, data):
+    return {
+        'search': search_stats(context),
+        'timings': timings,
+        'fetch_queries': data['query_count'],
+        'context': context_size(context, units)
+    }
+
+def _run_generation(settings, progress, cancel):
+    engine = settings['engine']
+    rng = random.Random(settings['seed'])
+    timings = {}
+
+    print(f"Generating timetable (ORM, engine={engine}).")
     
     try:
-        # Clear old
-        TimetableEntry.query.delete()
-        db.session.commit()
-        print("Cleared previous entries.")
-
         # Fetch Data
-        data = fetch_scheduling_data_orm()
+        progress['phase'] = 'fetching'
+        with timed(timings, 'fetch'):
+            data = fetch_scheduling_data_orm()
         if not data:
-             return jsonify({'error': 'Failed to fetch data'}), 500
+             return {'error': 'Failed to fetch data'}, 500
+
+        # Reject obviously impossible inputs before touching the stored timetable
+        with timed(timings, 'feasibility'):
+            problems = analyze_feasibility(data)
+        if problems:
+            print(f"Feasibility check failed with {len(problems)} problem(s).")
+            return {
+                'message': 'Timetable is infeasible: ' + ' '.join(p['message'] for p in problems),
+                'entries_generated': 0,
+                'problems': problems
+            }, 422
+
+        if settings['incremental']:
+            return generate_incremental(data, settings, rng, progress, cancel, timings)
+        cache_key = input_fingerprint(data, settings)
+        cached = get_cached_solution(cache_key) if settings['cache'] else None
+        with timed(timings, 'fetch'):
+            previous = stored_entries() if settings['warm_start'] or cached is not None else []
+
+        with timed(timings, 'expand'):
+            assignments_needed = build_assignments(data)
+            order_assignments(assignments_needed, rng)
+            context = build_solver_context(data, rng)
+            # A cached timetable is reused as it is, so it needs no hints.
+            if previous and cached is None:
+                context['hints'] = warm_start_hints(assignments_needed, context, previous)
+
+        # Anytime mode: solvers stop at the deadline and keep their best partial.
+        _attach_hooks(context, settings, progress, cancel)
+        timeout = PORTFOLIO_TIMEOUT
+        if settings['time_budget']:
+            timeout = settings['time_budget'] + POOL_GRACE_SECONDS
+
+        progress.update(phase='solving', total=len(assignments_needed), placed=0, backtracks=0)
+        if cached is not None:
+            print("Inputs unchanged since a previous solve; reusing its timetable.")
+            record_assignments(context, cached)
+            success = True
+        else:
+            print(f"Starting solver for {len(assignments_needed)} assignments...")
+            with timed(timings, 'search'):
+                if settings['portfolio'] > 1:
+                    success = solve_portfolio(assignments_needed, context, engine, settings['portfolio'], timeout)
+                elif settings['decompose']:
+                    success = solve_decomposed(assignments_needed, context, engine, timeout)
+                else:
+                    success = SOLVERS[engine](assignments_needed, context)
+            if success and settings['optimize']:
+                progress['phase'] = 'optimizing'
+                with timed(timings, 'optimize'):
+                    context['optimization'] = optimize_timetable(
+                        assignments_needed, context, context.get('deadline') or time.monotonic() + OPTIMIZE_SECONDS)
+                print(f"Optimized soft score {context['optimization']['before']} -> {context['optimization']['after']}.")
+            if success:
+                store_solution(cache_key, context['results'])
+
+        placed = context['results'] if success else context.get('best_results', [])
+        unplaced = summarize_unplaced(assignments_needed, placed)
+        cancelled = bool(context.get('cancelled'))
+        # Repeated clicks on unchanged inputs: the published generation already holds the timetable.
+        reused = cached is not None and len(previous) == len(cached) == count_unchanged(previous, cached)
+        persist = not reused and not cancelled and (success or settings['persist_partial'])
+
+        # Post-solve assertion: never save a timetable that breaks a hard rule.
+        if persist:
+            with timed(timings, 'validate'):
+                report = validate_timetable(placed, reference_from_data(data))
+            if not report['conflict_free'] or (success and not report['valid']):
+                print(f"Solver output failed validation: {report['double_bookings']} double-bookings, "
+                      f"{report['year_group_violations']} year-group violations.")
+                return {'error': 'The solver produced an invalid timetable; it was not saved.',
+                        'validation': report}, 500
+        progress.update(phase='saving', placed=len(placed))
+        soft_score = score_timetable(context, placed)
+
+        generated_entries = len(placed) if reused else 0
+        generation_id = published_generation_id() if reused else None
+        if persist:
+            # Readers keep the published generation until this commit moves the pointer.
+            with timed(timings, 'persist'):
+                generation_id = save_generation(
+                    placed, publish=settings['publish'], engine=engine, complete=success,
+                    seed=None if settings['seed'] is None else str(settings['seed']),
+                    soft_score=soft_score['total'])
+                collect_generations()
+            generated_entries = len(placed)
 
-        lecture_rooms = [loc for loc in data['locations'] if not loc.is_lab]
-        lab_rooms = [loc for loc in data['locations'] if loc.is_lab]
-        
-        # Build Assignments List
-        assignments_needed = []
-        for cls_id, reqs in data['class_subject_requirements'].items():
-            # Find class object from list (inefficient but safe) or map
-            cls_info = next((c for c in data['classes'] if c.class_id == cls_id), None)
-            if not cls_info: continue
-            
-            for subject_id, hours, is_lab in reqs:
-                for _ in range(hours):
-                    assignments_needed.append({
-                        'class_id': cls_id,
-                        'subject_id': subject_id,
-                        'is_lab': is_lab,
-                        'year': cls_info.year
-                    })
-        
-        random.shuffle(assignments_needed)
-        # Labs first
-        assignments_needed.sort(key=lambda x: x['is_lab'], reverse=True)
-
-        context = {
-            'timeslots': data['timeslots'],
-            'subjects_map': data['subjects'], # To look up faculty
-            'lecture_rooms': lecture_rooms,
-            'lab_rooms': lab_rooms,
-            'class_schedule': {},
-            'faculty_schedule': {},
-            'location_schedule': {},
-            'results': []
-        }
-
-        print(f"Starting solver for {len(assignments_needed)} assignments...")
-        success = solve_timetable_backtracking(assignments_needed, context)
-
-        generated_entries = 0
         if success:
             print("Solution found!")
-            for r in context['results']:
-                entry = TimetableEntry(
-                    class_id=r['class_id'],
-                    slot_id=r['slot_id'],
-                    subject_id=r['subject_id'],
-                    faculty_id=r['faculty_id'],
-                    location_id=r['location_id']
-                )
-                db.session.add(entry)
-            
-            db.session.commit()
-            generated_entries = len(context['results'])
             message = f"Successfully generated {generated_entries} entries."
+            if reused:
+                message += f" Published generation {generation_id} already holds this timetable; nothing was saved."
+            elif persist and not settings['publish']:
+                message += f" Saved unpublished as generation {generation_id}."
+        elif cancelled:
+            message = f"Generation was cancelled after placing {len(placed)} of {len(assignments_needed)} lectures."
         else:
-            message = "Could not generate a conflict-free timetable for all requirements."
-            generated_entries = 0
-            failed_assignments = len(assignments_needed) # Estimate
+            if not context.get('timed_out'):
+                reason = "Could not generate a conflict-free timetable"
+            elif settings['time_budget']:
+                reason = "Time budget ran out"
+            else:
+                reason = f"The parallel solve hit its {PORTFOLIO_TIMEOUT}s limit"
+            message = f"{reason}: placed {len(placed)} of {len(assignments_needed)} lectures."
+            if persist:
+                message += " The partial timetable was saved."
+            else:
+                message += " The previous timetable was left unchanged."
 
-        return jsonify({
+        progress['phase'] = 'done'
+        return {
             'message': message,
             'entries_generated': generated_entries,
-            'failed_assignments': 0 if success else "All"
-        }), 200
+            'placed': len(placed),
+            'failed_assignments': sum(u['hours_missing'] for u in unplaced),
+            'unplaced': unplaced,
+            'timed_out': bool(context.get('timed_out')),
+            'cancelled': cancelled,
+            'cached': cached is not None,
+            'soft_score': dict(soft_score, optimization=context.get('optimization')),
+            'unchanged_entries': count_unchanged(previous, placed) if persist or reused else 0,
+            'partial_persisted': persist and not success,
+            'generation_id': generation_id,
+            'published': reused or (persist and settings['publish']),
+            'stats': _solve_stats(context, len(assignments_needed), timings, data)
+        }, 200
 
     except Exception as e:
         db.session.rollback()
         print(f"Error generation: {e}")
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
+
+def stored_entries(generation_id=None):
+    """A saved generation (the published one by default) as plain dicts,
+    oldest entry first. Empty when nothing is published yet."""
+    if generation_id is None:
+        generation_id = published_generation_id()
+        if generation_id is None:
+            return []
+    return [{
+        'entry_id': e.entry_id, 'class_id': e.class_id, 'slot_id': e.slot_id,
+        'subject_id': e.subject_id, 'faculty_id': e.faculty_id, 'location_id': e.location_id
+    } for e in TimetableEntry.query.filter_by(generation_id=generation_id).order_by(TimetableEntry.entry_id)]
+
+def generate_incremental(data, settings, rng, progress, cancel, timings):
+    """
+    Incremental branch of run_generation: the kept entries of the published
+    generation are copied into a new one next to the re-placed lectures.
+    """
+    with timed(timings, 'fetch'):
+        entries = stored_entries()
+
+    with timed(timings, 'expand'):
+        assignments_needed = build_assignments(data)
+        order_assignments(assignments_needed, rng)
+        context = build_solver_context(data, rng)
+    _attach_hooks(context, settings, progress, cancel)
+    progress.update(phase='solving', total=len(assignments_needed), placed=0, backtracks=0)
+
+    with timed(timings, 'search'):
+        success, fixed, new = solve_incremental(assignments_needed, context, entries, settings['engine'])
+    if not success:
+        return {
+            'message': 'Could not fit the changes into the current timetable; it was left unchanged.',
+            'entries_generated': 0,
+            'timed_out': bool(context.get('timed_out')),
+            'cancelled': bool(context.get('cancelled')),
+            'stats': _solve_stats(context, len(assignments_needed), timings, data)
+        }, 200
+
+    # Same post-solve assertion as a full run, over the kept and new entries together.
+    with timed(timings, 'validate'):
+        report = validate_timetable(fixed + new, reference_from_data(data))
+    if not report['valid']:
+        print(f"Incremental output failed validation: {report['double_bookings']} double-bookings, "
+              f"{report['year_group_violations']} year-group violations.")
+        return {'error': 'The solver produced an invalid timetable; it was not saved.',
+                'validation': report}, 500
+
+    fixed_ids = {e['entry_id'] for e in fixed}
+    stale_ids = [e['entry_id'] for e in entries if e['entry_id'] not in fixed_ids]
+    with timed(timings, 'persist'):
+        generation_id = save_generation(
+            new, publish=settings['publish'], keep_entry_ids=sorted(fixed_ids), engine=settings['engine'],
+            seed=None if settings['seed'] is None else str(settings['seed']),
+            soft_score=score_timetable(context, fixed + new)['total'])
+        collect_generations()
+    progress['phase'] = 'done'
+
+    return {
+        'message': f"Updated timetable: kept {len(fixed)} entries, replaced {len(stale_ids)}, added {len(new)}.",
+        'entries_generated': len(new),
+        'entries_kept': len(fixed),
+        'entries_removed': len(stale_ids),
+        'generation_id': generation_id,
+        'published': settings['publish'],
+        'failed_assignments': 0,
+        'unplaced': [],
+        'timed_out': False,
+        'cancelled': False,
+        'stats': _solve_stats(context, len(assignments_needed), timings, data)
+    }, 200
+
+@scheduler_bp.route('/generate-timetable', methods=['POST'])
+def generate_timetable():
+    """
+    Submits a generation job and returns its id straight away (202). Poll
+    /generate-timetable/jobs/<id> or stream its /events; pass "wait": true to
+    run the generation inside the request instead.
+
+    Portfolio and decomposed solves without a "time_budget" still stop
+    after PORTFOLIO_TIMEOUT seconds; the reply then has "timed_out": true
+    and says that this limit, not a budget, ended the search.
+    """
+    settings, error = parse_generate_options(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({'error': error}), 400
+
+    if settings['wait']:
+        payload, status = run_generation(settings)
+        return jsonify(payload), status
+
+    job_id = submit_job(current_app._get_current_object(),
+                        lambda progress, cancel: run_generation(settings, progress, cancel))
+    print(f"Queued timetable generation job {job_id}.")
+    return jsonify({
+        'message': 'Timetable generation started.',
+        'job_id': job_id,
+        'status_url': url_for('scheduler.get_generation_job', job_id=job_id),
+        'events_url': url_for('scheduler.stream_generation_job', job_id=job_id)
+    }), 202
+
+@scheduler_bp.route('/timetable/validate', methods=['GET', 'POST'])
+def validate_timetable_endpoint():
+    """
+    Validates the stored timetable (GET) or the entries posted as a JSON
+    array or as {"entries": [...]} (POST) against the current data.
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        entries = body.get('entries') if isinstance(body, dict) else body
+        if not isinstance(entries, list):
+            return jsonify({'error': 'Send a JSON array of entries or {"entries": [...]}'}), 400
+        for i, e in enumerate(entries):
+            if not isinstance(e, dict) or not all(
+                    isinstance(e.get(k), int) and not isinstance(e.get(k), bool) for k in ENTRY_FIELDS):
+                return jsonify({'error': f'Entry {i} needs integer {", ".join(ENTRY_FIELDS)}'}), 400
+    else:
+        entries = stored_entries()
+
+    data = fetch_scheduling_data_orm()
+    if not data:
+        return jsonify({'error': 'Failed to fetch data'}), 500
+    return jsonify(validate_timetable(entries, reference_from_data(data))), 200
+
+@scheduler_bp.route('/timetable/generations', methods=['GET'])
+def get_generations():
+    return jsonify(list_generations()), 200
+
+@scheduler_bp.route('/timetable/generations/<int:generation_id>/publish', methods=['POST'])
+def publish_generation_endpoint(generation_id):
+    """Makes a stored generation the published timetable; publishing an
+    older one is a rollback."""
+    if not publish_generation(generation_id):
+        return jsonify({'error': 'Generation not found'}), 404
+    return jsonify({'message': f'Generation {generation_id} published.', 'generation_id': generation_id}), 200
+
+@scheduler_bp.route('/timetable/generations/<int:generation_id>', methods=['DELETE'])
+def delete_generation_endpoint(generation_id):
+    if generation_id == published_generation_id():
+        return jsonify({'error': 'The published generation cannot be deleted'}), 409
+    if not delete_generations([generation_id]):
+        return jsonify({'error': 'Generation not found'}), 404
+    return jsonify({'message': f'Generation {generation_id} deleted.'}), 200
+
+@scheduler_bp.route('/timetable/generations', methods=['DELETE'])
+def collect_generations_endpoint():
+    """Drops all but the newest ?keep= (default KEEP_GENERATIONS) unpublished generations."""
+    keep = request.args.get('keep', KEEP_GENERATIONS, type=int)
+    if keep < 0:
+        return jsonify({'error': 'keep must be zero or more'}), 400
+    dropped = collect_generations(keep)
+    return jsonify({'message': f'Dropped {dropped} generation(s).', 'dropped': dropped}), 200
+
+@scheduler_bp.route('/generate-timetable/cache', methods=['DELETE'])
+def clear_solution_cache():
+    dropped = invalidate_solution_cache()
+    return jsonify({'message': f'Dropped {dropped} cached solution(s).', 'dropped': dropped}), 200
+
+@scheduler_bp.route('/generate-timetable/jobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+@scheduler_bp.route('/generate-timetable/jobs/<job_id>', methods=['DELETE'])
+def cancel_generation_job(job_id):
+    job = cancel_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 202
+
+@scheduler_bp.route('/generate-timetable/jobs/<job_id>/events', methods=['GET'])
+def stream_generation_job(job_id):
+    """Server-sent events: a 'progress' event every interval, then one 'done' event."""
+    if not get_job(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        while True:
+            job = get_job(job_id)
+            if not job:
+                return
+            finished = job['status'] not in ('queued', 'running')
+            yield f"event: {'done' if finished else 'progress'}\ndata: {json.dumps(job)}\n\n"
+            if finished:
+                return
+            time.sleep(EVENT_INTERVAL_SECONDS)
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from backend.models import (
+    Class, ClassSubject, Faculty, Location, Subject, TimeSlot, faculty_subjects
+)
+import hashlib
+import json
+import threading
+
+# Solutions kept; the least recently used one is dropped first.
+MAX_CACHED_SOLUTIONS = 32
+# Settings that change which timetable a solve produces.
+KEY_SETTINGS = ('engine', 'portfolio', 'decompose', 'seed', 'optimize')
+# Writes to any of these make every cached solution stale.
+INPUT_MODELS = (Class, ClassSubject, Faculty, Location, Subject, TimeSlot)
+INPUT_TABLES = {model.__tablename__ for model in INPUT_MODELS} | {faculty_subjects.name}
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def input_fingerprint(data, settings):
+    """
+    SHA-256 of the scheduling inputs in fetch_scheduling_data_orm output,
+    normalised so that row order does not matter, plus the KEY_SETTINGS.
+    Timeslots keep their order: it is the order the solvers walk them in.
+    """
+    normalized = {
+        'classes': sorted([c.class_id, c.year] for c in data['classes']),
+        'requirements': sorted(
+            [cls_id, subject_id, hours, bool(is_lab)]
+            for cls_id, reqs in data['class_subject_requirements'].items()
+            for subject_id, hours, is_lab in reqs
+        ),
+        'faculty': sorted(
+            [subject_id, sorted(subject.faculty_ids)]
+            for subject_id, subject in data['subjects'].items()
+        ),
+        'locations': sorted([loc.location_id, bool(loc.is_lab), loc.building] for loc in data['locations']),
+        'timeslots': [[s.slot_id, s.applicable_year_group, s.day_of_week, s.period_number] for s in data['timeslots']],
+        'settings': [settings.get(key) for key in KEY_SETTINGS],
+    }
+    encoded = json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def get_cached_solution(key):
+    """The cached results list for key, or None. A hit becomes most recent."""
+    with _lock:
+        results = _cache.get(key)
+        if results is not None:
+            _cache.move_to_end(key)
+        return results
+
+def store_solution(key, results):
+    with _lock:
+        _cache[key] = [dict(r) for r in results]
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_SOLUTIONS:
+            _cache.popitem(last=False)
+
+def invalidate_solution_cache():
+    """Drops every cached solution. Returns how many there were."""
+    with _lock:
+        count = len(_cache)
+        _cache.clear()
+    if count:
+        print(f"Solution cache invalidated ({count} entries).")
+    return count
+
+def cache_size():
+    return len(_cache)
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_on_flush(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, INPUT_MODELS):
+            invalidate_solution_cache()
+            return
+
+@event.listens_for(Session, 'do_orm_execute')
+def _invalidate_on_bulk_write(orm_execute_state):
+    # Query.update()/delete() and Core statements skip the flush.
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if getattr(table, 'name', None) in INPUT_TABLES:
+        invalidate_solution_cache()
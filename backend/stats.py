@@ -0,0 +1,85 @@
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import event
+import cProfile
+import io
+import pstats
+import time
+
+# Functions listed in a profile report, by cumulative time.
+PROFILE_TOP_FUNCTIONS = 25
+
+def search_stats(context):
+    """
+    The context's search counters, created on first use:
+    nodes (units the search opened), candidates_tried (placements it
+    tried), backtracks, backtracks_by_depth and peak_depth (most units
+    placed at once).
+    """
+    stats = context.get('stats')
+    if stats is None:
+        stats = context['stats'] = {
+            'nodes': 0,
+            'candidates_tried': 0,
+            'backtracks': 0,
+            'backtracks_by_depth': Counter(),
+            'peak_depth': 0
+        }
+    return stats
+
+def merge_search_stats(into, other):
+    """Adds the counters of another solve (a worker or a component) into into."""
+    if not other:
+        return into
+    for key in ('nodes', 'candidates_tried', 'backtracks'):
+        into[key] += other[key]
+    into['backtracks_by_depth'].update(other['backtracks_by_depth'])
+    into['peak_depth'] = max(into['peak_depth'], other['peak_depth'])
+    return into
+
+def context_size(context, units):
+    """How big the search state got: units, slots and tracked resources."""
+    return {
+        'units': units,
+        'timeslots': len(context['timeslots']),
+        'classes': len(context['class_schedule']),
+        'faculty': len(context['faculty_schedule']),
+        'locations': len(context['location_schedule']),
+        'results': len(context['results'])
+    }
+
+@contextmanager
+def timed(timings, phase):
+    """Adds the seconds spent in the with-block to timings[phase]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = round(timings.get(phase, 0) + time.perf_counter() - start, 4)
+
+@contextmanager
+def count_queries(engine):
+    """Counts the statements engine sends to the database in the with-block,
+    as the 'count' of the yielded dict."""
+    counter = {'count': 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def profile_call(func, *args):
+    """
+    Runs func(*args) under cProfile. Returns (result, report), the report
+    being the top functions by cumulative time as text. Only this thread is
+    profiled; work done in pool processes shows up as waiting.
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    return result, out.getvalue()
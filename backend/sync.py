@@ -0,0 +1,86 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import and_, or_, select
+from backend.database import db
+from backend.listing import json_value
+from backend.models import (
+    Faculty, Subject, Branch, Section, Class, Location, TimeSlot, ClassSubject, ChangeCounter, Tombstone
+)
+
+sync_bp = Blueprint('sync', __name__)
+
+# Resources a client can sync, by the name used in /changes.
+SYNCED = {
+    'faculties': Faculty,
+    'subjects': Subject,
+    'branches': Branch,
+    'sections': Section,
+    'classes': Class,
+    'locations': Location,
+    'timeslots': TimeSlot,
+    'class_subjects': ClassSubject,
+}
+
+def current_token():
+    return db.session.execute(select(ChangeCounter.value).where(ChangeCounter.id == 1)).scalar() or 0
+
+def changes_since(since, names):
+    """
+    Rows of the named resources written after version since, and the ids
+    deleted since then, up to the current version (returned as the next
+    token). since=0 is a full sync; it also returns rows from before
+    change tracking, which have no version.
+    """
+    until = current_token()
+    changes, deleted = {}, {}
+    for name in names:
+        table = SYNCED[name].__table__
+        version = table.c.row_version
+        if since:
+            condition = and_(version > since, version <= until)
+        else:
+            condition = or_(version <= until, version.is_(None))
+        query = select(table).where(condition).order_by(version, *table.primary_key.columns)
+        changes[name] = [{key: json_value(value) for key, value in row._mapping.items()}
+                         for row in db.session.execute(query)]
+        deleted[name] = []
+
+    if since:
+        tables = {SYNCED[name].__tablename__: name for name in names}
+        tombstones = db.session.execute(
+            select(Tombstone.table_name, Tombstone.row_id)
+            .where(Tombstone.row_version > since, Tombstone.row_version <= until,
+                   Tombstone.table_name.in_(list(tables)))
+            .order_by(Tombstone.row_version, Tombstone.tombstone_id))
+        for table_name, row_id in tombstones:
+            deleted[tables[table_name]].append(row_id)
+    return until, changes, deleted
+
+@sync_bp.route('/changes', methods=['GET'])
+def get_changes():
+    """
+    Delta sync: GET /changes?since=<token>[&resources=faculties,classes].
+    Returns the rows changed and the ids deleted since the token, and the
+    token to send next time. Start with since=0.
+    """
+    since = request.args.get('since', '0')
+    try:
+        since = int(since)
+        if since < 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'since must be a token from a previous /changes reply, or 0'}), 400
+
+    names = request.args.get('resources')
+    names = [n.strip() for n in names.split(',') if n.strip()] if names else list(SYNCED)
+    unknown = [n for n in names if n not in SYNCED]
+    if unknown:
+        return jsonify({'error': f'Unknown resource(s) {", ".join(unknown)}; choose from {", ".join(SYNCED)}'}), 400
+
+    try:
+        token, changes, deleted = changes_since(since, names)
+    except Exception as e:
+        print(f"Error reading changes: {e}")
+        return jsonify({'error': 'An internal server error occurred'}), 500
+    if since > token:
+        return jsonify({'error': 'The token is ahead of the server; sync again from 0'}), 410
+    return jsonify({'token': str(token), 'changes': changes, 'deleted': deleted}), 200
@@ -0,0 +1,131 @@
+import datetime as dt
+import random
+from backend.database import db
+from backend.eligibility import DAYS as WEEK
+from backend.models import (
+    Branch, Section, Class, Subject, Faculty, Location, TimeSlot, ClassSubject
+)
+
+# Generated institutions teach Monday to Friday.
+DAYS = WEEK[:5]
+YEARS = (1, 2, 3, 4)
+
+# Institution sizes for benchmarks. Every class gets LECTURES_PER_CLASS
+# lecture subjects and LABS_PER_CLASS lab subjects; load is the share of
+# each class's and room kind's eligible slots the demand fills.
+SCALES = {
+    'small': {'branches': 1, 'sections': 2, 'load': 0.8},
+    'medium': {'branches': 3, 'sections': 2, 'load': 0.8},
+    'large': {'branches': 6, 'sections': 3, 'load': 0.8},
+    'xlarge': {'branches': 12, 'sections': 4, 'load': 0.8},
+    'tight': {'branches': 3, 'sections': 2, 'load': 0.9},
+}
+PERIODS_PER_DAY = 8
+LECTURES_PER_CLASS = 5
+LABS_PER_CLASS = 2
+# Teaching hours a generated faculty member is planned for.
+FACULTY_HOURS = 18
+
+def year_group_for_period(period):
+    """Last two periods of the day: one for first years, one for seniors."""
+    if period == PERIODS_PER_DAY - 1:
+        return '1'
+    if period == PERIODS_PER_DAY:
+        return '2-3+'
+    return 'ALL'
+
+def generate_institution(scale='small', seed=0):
+    """
+    Fills the current database with a synthetic institution sized by
+    SCALES[scale] (or a dict with the same keys). The same seed always
+    gives the same data. Class and room loads stay within the scale's load
+    and faculty loads within FACULTY_HOURS, so the result passes the
+    feasibility check. Returns a summary of what was created.
+    """
+    size = SCALES[scale] if isinstance(scale, str) else scale
+    rng = random.Random(seed)
+    eligible = len(DAYS) * (PERIODS_PER_DAY - 1)
+
+    for day in DAYS:
+        for period in range(1, PERIODS_PER_DAY + 1):
+            db.session.add(TimeSlot(
+                day_of_week=day, period_number=period,
+                start_time=dt.time(7 + period), end_time=dt.time(8 + period),
+                applicable_year_group=year_group_for_period(period)
+            ))
+
+    sections = [Section(name=chr(ord('A') + i)) for i in range(size['sections'])]
+    branches = [Branch(name=f'Branch {b}', code=f'B{b}') for b in range(size['branches'])]
+    db.session.add_all(sections + branches)
+    db.session.flush()
+
+    # Class-hours per week a class spends on lectures and on labs.
+    class_hours = int(eligible * size['load'])
+    lab_hours = 2 * LABS_PER_CLASS
+    lecture_hours = class_hours - lab_hours
+
+    classes, subjects, demand = [], [], {}
+    lab_demand = 0
+    for branch in branches:
+        for year in YEARS:
+            year_subjects = []
+            hours = [lecture_hours // LECTURES_PER_CLASS] * LECTURES_PER_CLASS
+            for i in range(lecture_hours % LECTURES_PER_CLASS):
+                hours[i] += 1
+            for i, h in enumerate(hours):
+                year_subjects.append((Subject(code=f'{branch.code}-{year}-L{i}', name=f'{branch.name} Y{year} Lecture {i}'), h))
+            for i in range(LABS_PER_CLASS):
+                year_subjects.append((Subject(code=f'{branch.code}-{year}-P{i}', name=f'{branch.name} Y{year} Lab {i}', is_lab=True), 2))
+            db.session.add_all([s for s, _ in year_subjects])
+            subjects.extend(s for s, _ in year_subjects)
+
+            for section in sections:
+                cls = Class(branch_id=branch.branch_id, section_id=section.section_id, year=year,
+                            class_name=f'{branch.code} {year}{section.name}')
+                classes.append((cls, year_subjects))
+                for subject, h in year_subjects:
+                    demand[subject.code] = demand.get(subject.code, 0) + h
+                    if subject.is_lab:
+                        lab_demand += h
+    db.session.add_all([cls for cls, _ in classes])
+    db.session.flush()
+
+    for cls, year_subjects in classes:
+        for subject, h in year_subjects:
+            db.session.add(ClassSubject(class_id=cls.class_id, subject_id=subject.subject_id, hours_per_week=h))
+
+    # Each subject goes to two teachers; subjects are dealt out so nobody's
+    # planned load passes FACULTY_HOURS.
+    total_hours = sum(demand.values())
+    faculty = [Faculty(name=f'Teacher {i}', faculty_code=f'T{i:04d}')
+               for i in range(max(2, -(-total_hours // FACULTY_HOURS)))]
+    load = [0] * len(faculty)
+    order = list(subjects)
+    rng.shuffle(order)
+    for subject in order:
+        share = -(-demand[subject.code] // 2)
+        for i in sorted(range(len(faculty)), key=lambda i: (load[i], rng.random()))[:2]:
+            faculty[i].subjects.append(subject)
+            load[i] += share
+    db.session.add_all(faculty)
+
+    # Rooms: lecture and lab demand over the slots every year can use,
+    # spread to the scale's load.
+    room_slots = int(eligible * size['load'])
+    n_lecture = max(1, -(-(total_hours - lab_demand) // room_slots))
+    n_lab = max(1, -(-lab_demand // room_slots))
+    for i in range(n_lecture):
+        db.session.add(Location(room_no=f'R{i:03d}', building=f'Block {i % 4}'))
+    for i in range(n_lab):
+        db.session.add(Location(room_no=f'L{i:03d}', building=f'Block {i % 4}', is_lab=True))
+    db.session.commit()
+
+    return {
+        'classes': len(classes),
+        'subjects': len(subjects),
+        'faculty': len(faculty),
+        'lecture_rooms': n_lecture,
+        'lab_rooms': n_lab,
+        'timeslots': len(DAYS) * PERIODS_PER_DAY,
+        'units': total_hours
+    }
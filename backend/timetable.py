@@ -0,0 +1,120 @@
+from flask import Blueprint, Response, request, jsonify
+from sqlalchemy import select
+from backend.database import db, time_converter
+from backend.eligibility import DAYS, day_order
+from backend.models import Class, Faculty, Location, Subject, TimeSlot, TimetableEntry
+from backend.persistence import published_generation_id
+import csv
+import io
+
+timetable_bp = Blueprint('timetable', __name__)
+
+# Columns of a timetable row, in CSV order.
+ROW_FIELDS = (
+    'entry_id', 'day_of_week', 'period_number', 'start_time', 'end_time', 'slot_id',
+    'class_id', 'class_name', 'subject_id', 'subject_code', 'subject_name',
+    'faculty_id', 'faculty_name', 'location_id', 'room_no', 'building'
+)
+
+def _generation():
+    """The ?generation= id, or the published one; None if there is neither."""
+    generation_id = request.args.get('generation', type=int)
+    return generation_id if generation_id is not None else published_generation_id()
+
+def _rows(generation_id, *conditions):
+    """
+    Entries of a generation joined to their display names in one SELECT.
+    The conditions narrow it along one of the (generation_id, x, slot_id)
+    indexes on timetable_entries.
+    """
+    entry = TimetableEntry.__table__
+    query = (
+        select(
+            entry.c.entry_id, TimeSlot.day_of_week, TimeSlot.period_number, TimeSlot.start_time,
+            TimeSlot.end_time, entry.c.slot_id, entry.c.class_id, Class.class_name, entry.c.subject_id,
+            Subject.code.label('subject_code'), Subject.name.label('subject_name'), entry.c.faculty_id,
+            Faculty.name.label('faculty_name'), entry.c.location_id, Location.room_no, Location.building
+        )
+        .join(TimeSlot, TimeSlot.slot_id == entry.c.slot_id)
+        .join(Class, Class.class_id == entry.c.class_id)
+        .join(Subject, Subject.subject_id == entry.c.subject_id)
+        .join(Faculty, Faculty.faculty_id == entry.c.faculty_id)
+        .join(Location, Location.location_id == entry.c.location_id)
+        .where(entry.c.generation_id == generation_id, *conditions)
+    )
+    rows = [dict(row._mapping) for row in db.session.execute(query)]
+    for row in rows:
+        row['start_time'] = time_converter(row['start_time'])
+        row['end_time'] = time_converter(row['end_time'])
+    rows.sort(key=lambda r: (day_order(r['day_of_week']), r['period_number'], r['class_name'] or '', r['entry_id']))
+    return rows
+
+def _view(key, value, *conditions):
+    try:
+        generation_id = _generation()
+        if generation_id is None:
+            return jsonify({'error': 'No timetable has been published yet'}), 404
+        return jsonify({
+            'generation_id': generation_id,
+            key: value,
+            'entries': _rows(generation_id, *conditions)
+        }), 200
+    except Exception as e:
+        print(f"Error reading timetable: {e}")
+        return jsonify({'error': 'Error reading timetable'}), 500
+
+@timetable_bp.route('/timetable/classes/<int:class_id>', methods=['GET'])
+def get_class_timetable(class_id):
+    return _view('class_id', class_id, TimetableEntry.class_id == class_id)
+
+@timetable_bp.route('/timetable/faculties/<int:faculty_id>', methods=['GET'])
+def get_faculty_timetable(faculty_id):
+    return _view('faculty_id', faculty_id, TimetableEntry.faculty_id == faculty_id)
+
+@timetable_bp.route('/timetable/locations/<int:location_id>', methods=['GET'])
+def get_location_timetable(location_id):
+    return _view('location_id', location_id, TimetableEntry.location_id == location_id)
+
+@timetable_bp.route('/timetable/days/<day>', methods=['GET'])
+def get_day_timetable(day):
+    day = day.capitalize()
+    if day not in DAYS:
+        return jsonify({'error': f'day must be one of {", ".join(DAYS)}'}), 400
+    return _view('day_of_week', day, TimeSlot.day_of_week == day)
+
+@timetable_bp.route('/timetable/grid', methods=['GET'])
+def export_timetable_grid():
+    """
+    The whole timetable. JSON by default: one row per class with its cells
+    keyed by day, then period. ?format=csv gives one line per entry.
+    """
+    try:
+        generation_id = _generation()
+        if generation_id is None:
+            return jsonify({'error': 'No timetable has been published yet'}), 404
+        rows = _rows(generation_id)
+
+        if request.args.get('format') == 'csv':
+            out = io.StringIO()
+            writer = csv.DictWriter(out, fieldnames=ROW_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+            return Response(out.getvalue(), mimetype='text/csv', headers={
+                'Content-Disposition': f'attachment; filename=timetable-{generation_id}.csv'
+            })
+
+        classes = {}
+        for row in rows:
+            cls = classes.setdefault(row['class_id'], {
+                'class_id': row['class_id'], 'class_name': row['class_name'], 'cells': {}
+            })
+            cls['cells'].setdefault(row['day_of_week'], {})[str(row['period_number'])] = row
+        return jsonify({
+            'generation_id': generation_id,
+            'days': [d for d in DAYS if any(d in c['cells'] for c in classes.values())],
+            'periods': sorted({r['period_number'] for r in rows}),
+            'classes': sorted(classes.values(), key=lambda c: c['class_name'] or '')
+        }), 200
+    except Exception as e:
+        print(f"Error exporting timetable: {e}")
+        return jsonify({'error': 'Error exporting timetable'}), 500
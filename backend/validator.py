@@ -0,0 +1,130 @@
+import numpy as np
+from backend.eligibility import year_group_admits
+
+# Problems listed per kind in a report; the counts always cover all of them.
+MAX_REPORTED = 500
+
+def reference_from_data(data):
+    """
+    The parts of fetch_scheduling_data_orm output the validator checks
+    against, as plain ids.
+    """
+    requirements = {}
+    for cls_id, reqs in data['class_subject_requirements'].items():
+        for subject_id, hours, _ in reqs:
+            requirements[(cls_id, subject_id)] = requirements.get((cls_id, subject_id), 0) + hours
+    return {
+        'timeslots': [(s.slot_id, s.applicable_year_group) for s in data['timeslots']],
+        'class_years': {c.class_id: c.year for c in data['classes']},
+        'subjects': list(data['subjects']),
+        'faculty': list(data['faculties']),
+        'locations': [loc.location_id for loc in data['locations']],
+        'requirements': requirements
+    }
+
+def _column(entries, key):
+    return np.fromiter((e[key] for e in entries), dtype=np.int64, count=len(entries))
+
+def _dense(values, known):
+    """Positions of values in the sorted known ids, and which values are known."""
+    known = np.asarray(sorted(known), dtype=np.int64)
+    if not len(known):
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+    idx = np.clip(np.searchsorted(known, values), 0, len(known) - 1)
+    return idx, known[idx] == values
+
+def _clashes(resource, ids, rows, slot_pos, slot_ids, n_rows, n_slots):
+    counts = np.bincount(rows * n_slots + slot_pos, minlength=n_rows * n_slots)
+    cells = np.flatnonzero(counts > 1)
+    listed = [{
+        'resource': resource, 'id': int(ids[cell // n_slots]),
+        'slot_id': int(slot_ids[cell % n_slots]), 'count': int(counts[cell])
+    } for cell in cells[:MAX_REPORTED]]
+    return len(cells), listed
+
+def validate_timetable(entries, reference):
+    """
+    Checks a whole timetable (dicts with class_id, slot_id, subject_id,
+    faculty_id and location_id) against reference_from_data output.
+
+    Occupancy per class, faculty and room is counted over (resource, slot)
+    cells with one np.bincount each. Year groups are checked through a
+    year x slot eligibility matrix, and hours per (class, subject) with one
+    more bincount against the requirements. Returns a report: counts per
+    problem kind, up to MAX_REPORTED examples of each, and the verdicts
+    conflict_free (no double-booking, year-group violation or unknown id),
+    complete (no shortfall) and valid (both, and no hours beyond the
+    requirements).
+    """
+    n = len(entries)
+    slot_ids = np.asarray([slot_id for slot_id, _ in reference['timeslots']], dtype=np.int64)
+    order = np.argsort(slot_ids, kind='stable')
+    class_ids = np.asarray(sorted(reference['class_years']), dtype=np.int64)
+    n_slots, n_classes = len(slot_ids), len(class_ids)
+
+    columns = {key: _column(entries, key) for key in ('class_id', 'slot_id', 'subject_id', 'faculty_id', 'location_id')}
+    slot_idx, slot_ok = _dense(columns['slot_id'], slot_ids)
+    slot_pos = order[slot_idx] if n_slots else slot_idx
+    class_row, class_ok = _dense(columns['class_id'], class_ids)
+    faculty_ids = np.asarray(sorted(reference['faculty']), dtype=np.int64)
+    faculty_row, faculty_ok = _dense(columns['faculty_id'], faculty_ids)
+    location_ids = np.asarray(sorted(reference['locations']), dtype=np.int64)
+    location_row, location_ok = _dense(columns['location_id'], location_ids)
+    _, subject_ok = _dense(columns['subject_id'], reference['subjects'])
+
+    known = slot_ok & class_ok & faculty_ok & location_ok & subject_ok
+    unknown = np.flatnonzero(~known)
+    report = {
+        'entries': n,
+        'unknown_references': int(len(unknown)),
+        'unknown': [{k: int(columns[k][i]) for k in columns} for i in unknown[:MAX_REPORTED]]
+    }
+
+    # Double-bookings, over the entries whose ids all resolve.
+    double_bookings, listed = 0, []
+    ok_slots = slot_pos[known]
+    for resource, ids, rows in (('class', class_ids, class_row), ('faculty', faculty_ids, faculty_row),
+                                ('location', location_ids, location_row)):
+        count, examples = _clashes(resource, ids, rows[known], ok_slots, slot_ids, len(ids), n_slots)
+        double_bookings += count
+        listed.extend(examples[:MAX_REPORTED - len(listed)])
+    report['double_bookings'] = double_bookings
+    report['double_booked'] = listed
+
+    # Year groups: eligible[year row, slot position].
+    years = sorted(set(reference['class_years'].values()))
+    groups = [group for _, group in reference['timeslots']]
+    eligible = np.array([[year_group_admits(group, year) for group in groups] for year in years],
+                        dtype=bool).reshape(len(years), n_slots)
+    year_of_class = np.searchsorted(np.asarray(years, dtype=np.int64),
+                                    [reference['class_years'][c] for c in class_ids.tolist()]).astype(np.int64)
+    checked = np.flatnonzero(known)
+    bad = checked[~eligible[year_of_class[class_row[checked]], slot_pos[checked]]] if n_classes else checked[:0]
+    report['year_group_violations'] = int(len(bad))
+    report['year_group_violated'] = [{
+        'class_id': int(columns['class_id'][i]), 'slot_id': int(columns['slot_id'][i]),
+        'year': reference['class_years'][int(columns['class_id'][i])],
+        'applicable_year_group': groups[int(slot_pos[i])]
+    } for i in bad[:MAX_REPORTED]]
+
+    # Hours per (class, subject) against the requirements.
+    req_keys = sorted(reference['requirements'])
+    req_code = {key: i for i, key in enumerate(req_keys)}
+    codes = np.fromiter((req_code.get((e['class_id'], e['subject_id']), -1) for e in entries),
+                        dtype=np.int64, count=n)
+    placed = np.bincount(codes[codes >= 0], minlength=len(req_keys))
+    required = np.fromiter((reference['requirements'][k] for k in req_keys), dtype=np.int64, count=len(req_keys))
+    short = np.flatnonzero(placed < required)
+    report['shortfalls'] = int(len(short))
+    report['short'] = [{
+        'class_id': req_keys[i][0], 'subject_id': req_keys[i][1],
+        'required': int(required[i]), 'placed': int(placed[i])
+    } for i in short[:MAX_REPORTED]]
+    report['excess'] = int(np.count_nonzero(placed > required))
+    report['unrequired_entries'] = int(np.count_nonzero(codes < 0))
+
+    report['conflict_free'] = not (report['unknown_references'] or double_bookings or len(bad))
+    report['complete'] = not len(short)
+    report['valid'] = report['conflict_free'] and report['complete'] \
+        and not (report['excess'] or report['unrequired_entries'])
+    return report
@@ -0,0 +1,151 @@
+"""
+Solver benchmarks on synthetic institutions.
+
+Each scale is generated into a fresh in-memory SQLite database and solved
+directly through backend.scheduler (no HTTP, no services). For every run
+it records wall time, peak traced memory, whether a full timetable was
+found and the backtrack count, then compares the aggregate with the
+baselines in benchmark_baselines.json.
+
+    python benchmark.py                      # small and medium
+    python benchmark.py --scales large tight --engine mrv
+    python benchmark.py --update-baselines   # record the current numbers
+
+Exits with status 1 when a scale regresses against its baseline.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from flask import Flask
+from backend.database import db
+from backend import models  # Import models to ensure they are registered
+from backend.scheduler import (
+    SOLVERS, build_assignments, build_solver_context, fetch_scheduling_data_orm, order_assignments
+)
+from backend.stats import search_stats
+from backend.synthetic import SCALES, generate_institution
+
+BASELINES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baselines.json')
+# Growth (ratio) tolerated before wall time, memory or backtracks count as
+# a regression.
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.25
+# Wall-time differences below this many seconds are treated as noise.
+TIME_NOISE = 0.05
+# Seconds a single solve may take before it counts as a failed run.
+RUN_TIME_LIMIT = 20
+
+def make_app():
+    bench_app = Flask(__name__)
+    bench_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    bench_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(bench_app)
+    return bench_app
+
+def solve_once(engine, seed, time_limit, trace_memory=False):
+    """One fetch-expand-solve pass over the current database."""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    data = fetch_scheduling_data_orm()
+    rng = random.Random(seed)
+    assignments_needed = build_assignments(data)
+    order_assignments(assignments_needed, rng)
+    context = build_solver_context(data, rng)
+    context['deadline'] = time.monotonic() + time_limit
+    success = SOLVERS[engine](assignments_needed, context)
+    wall_time = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        'success': success,
+        'wall_time': wall_time,
+        'peak_memory': peak,
+        'backtracks': search_stats(context)['backtracks'],
+        'units': len(assignments_needed)
+    }
+
+def run_scale(bench_app, scale, engine, runs, seed, time_limit=RUN_TIME_LIMIT):
+    """Generates the scale once, then solves it with runs different seeds."""
+    with bench_app.app_context():
+        db.drop_all()
+        db.create_all()
+        summary = generate_institution(scale, seed)
+        # Timing runs go untraced; tracemalloc slows Python code severalfold.
+        outcomes = [solve_once(engine, seed + i, time_limit) for i in range(runs)]
+        memory = solve_once(engine, seed, time_limit, trace_memory=True)['peak_memory']
+        db.session.remove()
+
+    wall_times = sorted(o['wall_time'] for o in outcomes)
+    return {
+        'units': summary['units'],
+        'classes': summary['classes'],
+        'wall_time': round(wall_times[len(wall_times) // 2], 4),
+        'peak_memory': memory,
+        'success_rate': sum(o['success'] for o in outcomes) / runs,
+        'backtracks': max(o['backtracks'] for o in outcomes)
+    }
+
+def compare(result, baseline):
+    """Regression messages for one scale; empty when it is within tolerance."""
+    problems = []
+    if result['success_rate'] < baseline['success_rate']:
+        problems.append(f"success rate {result['success_rate']:.2f} < {baseline['success_rate']:.2f}")
+    if result['wall_time'] > max(baseline['wall_time'] * TIME_TOLERANCE, baseline['wall_time'] + TIME_NOISE):
+        problems.append(f"wall time {result['wall_time']:.3f}s > {TIME_TOLERANCE}x {baseline['wall_time']:.3f}s")
+    if result['peak_memory'] > baseline['peak_memory'] * MEMORY_TOLERANCE:
+        problems.append(f"peak memory {result['peak_memory']} > {MEMORY_TOLERANCE}x {baseline['peak_memory']}")
+    if result['backtracks'] > baseline['backtracks'] * TIME_TOLERANCE:
+        problems.append(f"backtracks {result['backtracks']} > {TIME_TOLERANCE}x {baseline['backtracks']}")
+    return problems
+
+def load_baselines():
+    if not os.path.exists(BASELINES_FILE):
+        return {}
+    with open(BASELINES_FILE) as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the timetable solvers on synthetic data.')
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small', 'medium'])
+    parser.add_argument('--engine', choices=list(SOLVERS), default='backtracking')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-limit', type=float, default=RUN_TIME_LIMIT,
+                        help='seconds per solve before the run counts as failed')
+    parser.add_argument('--update-baselines', action='store_true')
+    args = parser.parse_args(argv)
+
+    bench_app = make_app()
+    baselines = load_baselines()
+    regressed = False
+    for scale in args.scales:
+        key = f'{args.engine}/{scale}'
+        result = run_scale(bench_app, scale, args.engine, args.runs, args.seed, args.time_limit)
+        print(f"{key}: {result['units']} units, {result['wall_time']:.3f}s, "
+              f"{result['peak_memory'] / 2 ** 20:.1f} MiB, success {result['success_rate']:.0%}, "
+              f"{result['backtracks']} backtracks")
+        if args.update_baselines:
+            baselines[key] = result
+        elif key in baselines:
+            problems = compare(result, baselines[key])
+            for problem in problems:
+                print(f"  REGRESSION: {problem}")
+            regressed = regressed or bool(problems)
+        else:
+            print("  no baseline recorded")
+
+    if args.update_baselines:
+        with open(BASELINES_FILE, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baselines written to {BASELINES_FILE}")
+    return 1 if regressed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
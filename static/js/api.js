@@ -320,13 +320,25 @@ async function addClass(e) {
 }
 
 async function handleGenerateTimetable() {
-    if (!confirm("Generate new timetable (overwriting old one)?")) return;
+    if (!confirm("Generate and publish a new timetable? The current one is kept as an earlier generation.")) return;
     const link = document.getElementById('generateTimetableLink');
     if (link) link.textContent = "Generating...";
     try {
         const res = await fetch(`${backendUrl}/generate-timetable`, { method: 'POST' });
         const data = await res.json();
-        alert(data.message);
+        if (res.status !== 202) {
+            alert(data.message || data.error);
+        } else {
+            // Poll the job until the solver finishes.
+            let job;
+            do {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                job = await (await fetch(`${backendUrl}/generate-timetable/jobs/${data.job_id}`)).json();
+                const p = job.progress || {};
+                if (link && p.total) link.textContent = `Generating... ${p.placed || 0}/${p.total}`;
+            } while (job.status === 'queued' || job.status === 'running');
+            alert(job.result ? (job.result.message || job.result.error) : "Generation stopped.");
+        }
     } catch (e) { alert("Error generating."); }
     if (link) link.textContent = "Generate Timetable";
 }
@@ -2,14 +2,79 @@
 import unittest
 import json
 import os
+import random
+import time
+import datetime as dt
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest.mock import patch
+from sqlalchemy.exc import IntegrityError
 from app import app, db
-from backend.models import User
+from backend.models import (
+    User, Faculty, Subject, Branch, Section, Class, Location, TimeSlot,
+    ClassSubject, TimetableEntry
+)
+from backend.eligibility import build_eligibility_index, eligible_slots, slot_positions
+from backend.feasibility import analyze_feasibility, popcount
+from backend.local_search import solve_timetable_min_conflicts
+from backend.scheduler import (
+    PORTFOLIO_TIMEOUT, SOLVERS, SlotInfo, decompose_assignments, fetch_scheduling_data_orm, solve_decomposed, solve_portfolio,
+    solve_timetable_backtracking, solve_timetable_mrv, summarize_unplaced
+)
+from backend.solution_cache import cache_size, invalidate_solution_cache
+from backend.list_cache import clear_list_cache
+from backend.persistence import published_generation_id
+from backend.objective import add_placement, new_objective, remove_placement, score_timetable
+from backend.synthetic import generate_institution
+from backend.validator import validate_timetable
+
+def seed_small_institution():
+    """Two first-year classes sharing one lecture room, one lab and two teachers."""
+    branch = Branch(name='CSE', code='CSE')
+    sec_a, sec_b = Section(name='A'), Section(name='B')
+    db.session.add_all([branch, sec_a, sec_b])
+    db.session.flush()
+
+    classes = [
+        Class(branch_id=branch.branch_id, section_id=sec.section_id, year=1, class_name=f'CSE 1{sec.name}')
+        for sec in (sec_a, sec_b)
+    ]
+    maths = Subject(code='MA101', name='Maths')
+    lab = Subject(code='CS101L', name='Programming Lab', is_lab=True)
+    alice = Faculty(name='Alice', faculty_code='F1')
+    bob = Faculty(name='Bob', faculty_code='F2')
+    alice.subjects.extend([maths, lab])
+    bob.subjects.append(maths)
+    db.session.add_all(classes + [maths, lab, alice, bob])
+    db.session.add_all([
+        Location(room_no='101', building='Main'),
+        Location(room_no='L1', building='Main', is_lab=True),
+    ])
+    for day in ('Monday', 'Tuesday'):
+        for period in range(1, 4):
+            db.session.add(TimeSlot(
+                day_of_week=day, period_number=period,
+                start_time=dt.time(8 + period), end_time=dt.time(9 + period),
+                applicable_year_group='ALL' if period < 3 else '1'
+            ))
+    db.session.flush()
+    for cls in classes:
+        db.session.add(ClassSubject(class_id=cls.class_id, subject_id=maths.subject_id, hours_per_week=3))
+        db.session.add(ClassSubject(class_id=cls.class_id, subject_id=lab.subject_id, hours_per_week=1))
+    db.session.commit()
+
+def placement(entry):
+    return (entry.class_id, entry.slot_id, entry.subject_id, entry.faculty_id, entry.location_id)
+
+def published_entries():
+    return TimetableEntry.query.filter_by(generation_id=published_generation_id()).order_by(TimetableEntry.entry_id).all()
 
 class TestTeacherScheduler(unittest.TestCase):
     def setUp(self):
         app.config['TESTING'] = True
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:' # Use in-memory DB for tests
         self.app = app.test_client()
+        clear_list_cache()
         
         with app.app_context():
             db.create_all()
@@ -54,9 +119,793 @@ class TestTeacherScheduler(unittest.TestCase):
         })
         self.assertEqual(response.status_code, 201)
 
+    def test_add_timeslot_rejects_unknown_year_group(self):
+        slot = {'day_of_week': 'Monday', 'period_number': 1, 'start_time': '09:00', 'end_time': '10:00'}
+        response = self.app.post('/api/timeslots', json=dict(slot, applicable_year_group='5'))
+        self.assertEqual(response.status_code, 400)
+        response = self.app.post('/api/timeslots', json=dict(slot, applicable_year_group='2-3+'))
+        self.assertEqual(response.status_code, 201)
+
+    def test_bulk_import_formats_and_row_errors(self):
+        result = json.loads(self.app.post('/api/import/subjects', json=[
+            {'code': 'MA101', 'name': 'Maths'},
+            {'code': 'CS101L', 'name': 'Lab', 'is_lab': True},
+            {'code': 'MA101', 'name': 'Duplicate'},
+            {'name': 'No code'},
+        ]).data)
+        self.assertEqual((result['received'], result['inserted'], result['error_count']), (4, 2, 2))
+        self.assertEqual([e['row'] for e in result['errors']], [3, 4])
+
+        self.app.post('/api/import/branches', json={'rows': [{'name': 'CSE', 'code': 'CSE'}]})
+        self.app.post('/api/import/sections', json=[{'name': 'A'}, {'name': 'B'}])
+        csv_body = 'branch_code,section_name,year,class_name\nCSE,A,1,CSE 1A\nCSE,B,1,\nECE,A,1,ECE 1A\n'
+        result = json.loads(self.app.post('/api/import/classes', data=csv_body, content_type='text/csv').data)
+        self.assertEqual((result['inserted'], result['errors']), (2, [{'row': 3, 'error': 'unknown branch_code "ECE"'}]))
+
+        ndjson = '\n'.join([
+            json.dumps({'class_name': 'CSE 1A', 'subject_code': 'MA101', 'hours_per_week': 3}),
+            json.dumps({'class_name': 'CSE Year 1 Section B', 'subject_code': 'CS101L'}),
+            json.dumps({'class_name': 'CSE 1A', 'subject_code': 'MA101'}),
+            'not json',
+        ])
+        with app.app_context():
+            self.assertEqual(Class.query.filter_by(class_name='CSE Year 1 Section B').count(), 1)
+        result = json.loads(self.app.post('/api/import/class-subjects', data=ndjson,
+                                          content_type='application/x-ndjson').data)
+        self.assertEqual((result['inserted'], [e['row'] for e in result['errors']]), (2, [3, 4]))
+        with app.app_context():
+            self.assertEqual(sorted(r.hours_per_week for r in ClassSubject.query.all()), [1, 3])
+
+        self.assertEqual(self.app.post('/api/import/users', json=[]).status_code, 404)
+        self.assertEqual(self.app.post('/api/import/subjects', json={'code': 'X'}).status_code, 400)
+
+    def test_list_pagination_projection_and_filters(self):
+        self.app.post('/api/import/faculties', json=[{'name': f'Teacher {i:02d}'} for i in range(7)])
+        names, cursor, pages = [], None, 0
+        while True:
+            url = '/api/faculties?limit=3&fields=name' + (f'&cursor={cursor}' if cursor else '')
+            page = json.loads(self.app.get(url).data)
+            self.assertTrue(all(list(item) == ['name'] for item in page['items']))
+            names += [item['name'] for item in page['items']]
+            pages += 1
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual((pages, names), (3, [f'Teacher {i:02d}' for i in range(7)]))
+        self.assertEqual(len(json.loads(self.app.get('/api/faculties').data)), 7)
+
+        with app.app_context():
+            seed_small_institution()
+            db.session.add(Class(branch_id=Branch.query.first().branch_id, section_id=Section.query.first().section_id,
+                                 year=2, class_name='CSE 2A'))
+            db.session.commit()
+        classes = json.loads(self.app.get('/api/classes?year=1&fields=class_name,branch_name').data)
+        self.assertEqual(classes, [{'class_name': 'CSE 1A', 'branch_name': 'CSE'},
+                                   {'class_name': 'CSE 1B', 'branch_name': 'CSE'}])
+        slots = json.loads(self.app.get('/api/timeslots?limit=4').data)
+        self.assertEqual([(s['day_of_week'], s['period_number']) for s in slots['items']],
+                         [('Monday', 1), ('Monday', 2), ('Monday', 3), ('Tuesday', 1)])
+        self.assertEqual(slots['items'][0]['start_time'], '09:00')
+        self.assertEqual(len(json.loads(self.app.get('/api/subjects?is_lab=true').data)), 1)
+        # Same boolean spellings as the bulk import.
+        self.assertEqual(len(json.loads(self.app.get('/api/subjects?is_lab=y').data)), 1)
+        self.assertEqual(len(json.loads(self.app.get('/api/subjects?is_lab=No').data)), 1)
+
+        for url in ('/api/faculties?fields=salary', '/api/faculties?limit=0', '/api/faculties?cursor=abc',
+                    '/api/classes?year=first', '/api/subjects?is_lab=maybe'):
+            self.assertEqual(self.app.get(url).status_code, 400, url)
+
+    def test_list_responses_are_cached_with_etags(self):
+        self.app.post('/api/faculties', json={'name': 'Alice', 'faculty_code': 'F1'})
+        first = self.app.get('/api/faculties')
+        etag = first.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        with patch('backend.listing.db.session.execute', side_effect=AssertionError('database touched')):
+            self.assertEqual(self.app.get('/api/faculties', headers={'If-None-Match': etag}).status_code, 304)
+            self.assertEqual(self.app.get('/api/faculties').get_data(), first.get_data())
+
+        self.app.post('/api/faculties', json={'name': 'Bob', 'faculty_code': 'F2'})
+        second = self.app.get('/api/faculties', headers={'If-None-Match': etag})
+        self.assertEqual((second.status_code, len(json.loads(second.data))), (200, 2))
+        self.assertNotEqual(second.headers['ETag'], etag)
+
+        # Classes also change with the branch names they show.
+        self.app.post('/api/branches', json={'name': 'CSE'})
+        self.app.post('/api/import/sections', json=[{'name': 'A'}])
+        self.app.post('/api/import/classes', json=[{'branch_name': 'CSE', 'section_name': 'A', 'year': 1}])
+        self.assertEqual(json.loads(self.app.get('/api/classes').data)[0]['branch_name'], 'CSE')
+        with app.app_context():
+            Branch.query.first().name = 'Computer Science'
+            db.session.commit()
+        self.assertEqual(json.loads(self.app.get('/api/classes').data)[0]['branch_name'], 'Computer Science')
+
+    def test_changes_since_token(self):
+        with app.app_context():
+            seed_small_institution()
+        full = json.loads(self.app.get('/api/changes?since=0').data)
+        self.assertEqual((len(full['changes']['classes']), len(full['changes']['class_subjects'])), (2, 4))
+        token = full['token']
+        self.assertEqual(json.loads(self.app.get(f'/api/changes?since={token}').data)['changes']['faculties'], [])
+
+        self.app.post('/api/faculties', json={'name': 'Carol', 'faculty_code': 'F3'})
+        with app.app_context():
+            Subject.query.filter_by(code='MA101').first().name = 'Mathematics'
+            cls = Class.query.filter_by(class_name='CSE 1B').first()
+            class_id = cls.class_id
+            db.session.delete(cls)
+            db.session.commit()
+        delta = json.loads(self.app.get(f'/api/changes?since={token}&resources=faculties,subjects,classes,class_subjects').data)
+        self.assertEqual([f['name'] for f in delta['changes']['faculties']], ['Carol'])
+        self.assertEqual([s['name'] for s in delta['changes']['subjects']], ['Mathematics'])
+        self.assertEqual(delta['deleted']['classes'], [class_id])
+        self.assertEqual(len(delta['deleted']['class_subjects']), 2)
+        self.assertNotIn('branches', delta['changes'])
+        self.assertGreater(int(delta['token']), int(token))
+
+        self.assertEqual(self.app.get(f"/api/changes?since={delta['token']}").status_code, 200)
+        self.assertEqual(self.app.get('/api/changes?since=999999').status_code, 410)
+        self.assertEqual(self.app.get('/api/changes?since=abc').status_code, 400)
+        self.assertEqual(self.app.get('/api/changes?resources=users').status_code, 400)
+
+    def wait_for_job(self, job_id, timeout=30):
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            job = json.loads(self.app.get(f'/api/generate-timetable/jobs/{job_id}').data)
+            if job['status'] not in ('queued', 'running'):
+                return job
+            time.sleep(0.05)
+        self.fail(f'job {job_id} did not finish')
+
     def test_generate_timetable_endpoint(self):
         response = self.app.post('/api/generate-timetable')
-        self.assertIn(response.status_code, [200, 500])
+        self.assertEqual(response.status_code, 202)
+        job = self.wait_for_job(json.loads(response.data)['job_id'])
+        self.assertIn(job['http_status'], [200, 500])
+
+    def test_generate_timetable_job(self):
+        with app.app_context():
+            seed_small_institution()
+        response = self.app.post('/api/generate-timetable', json={'engine': 'mrv'})
+        self.assertEqual(response.status_code, 202)
+        submitted = json.loads(response.data)
+        job = self.wait_for_job(submitted['job_id'])
+        self.assertEqual((job['status'], job['result']['entries_generated']), ('succeeded', 8))
+        self.assertEqual(job['progress']['phase'], 'done')
+
+        events = self.app.get(submitted['events_url']).get_data(as_text=True)
+        self.assertTrue(events.startswith('event: done\n'))
+        self.assertEqual(self.app.delete(submitted['status_url']).status_code, 202)
+        self.assertEqual(self.app.get('/api/generate-timetable/jobs/nope').status_code, 404)
+
+    def assertNoDoubleBooking(self, entries):
+        for key in ('class_id', 'faculty_id', 'location_id'):
+            seen = [(getattr(e, key), e.slot_id) for e in entries]
+            self.assertEqual(len(seen), len(set(seen)), f'{key} double-booked')
+
+    def test_generate_timetable_conflict_free(self):
+        with app.app_context():
+            seed_small_institution()
+        response = self.app.post('/api/generate-timetable', json={'time_budget': 5, 'wait': True})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['entries_generated'], 8)
+        self.assertEqual((data['failed_assignments'], data['unplaced'], data['timed_out']), (0, [], False))
+        stats = data['stats']
+        self.assertEqual(stats['search']['peak_depth'], 8)
+        self.assertGreaterEqual(stats['search']['candidates_tried'], 8)
+        self.assertEqual(set(stats['timings']), {'fetch', 'feasibility', 'expand', 'search', 'validate', 'persist'})
+        self.assertEqual((stats['context']['units'], stats['context']['timeslots']), (8, 6))
+        self.assertNotIn('profile', data)
+        with app.app_context():
+            self.assertNoDoubleBooking(published_entries())
+
+    def test_generate_timetable_reuses_cached_solution(self):
+        with app.app_context():
+            seed_small_institution()
+        invalidate_solution_cache()
+        options = {'seed': 5, 'wait': True}
+        first = json.loads(self.app.post('/api/generate-timetable', json=options).data)
+        second = json.loads(self.app.post('/api/generate-timetable', json=options).data)
+        self.assertEqual((first['cached'], second['cached'], second['entries_generated']), (False, True, 8))
+        self.assertNotIn('search', second['stats']['timings'])
+        # The published generation already holds the cached timetable, so nothing is saved again.
+        self.assertEqual((second['generation_id'], second['published']), (first['generation_id'], True))
+        self.assertNotIn('persist', second['stats']['timings'])
+        self.assertEqual(len(json.loads(self.app.get('/api/timetable/generations').data)), 1)
+        with app.app_context():
+            self.assertEqual(len(published_entries()), 8)
+            # Any write to an input table drops the cache.
+            db.session.add(Location(room_no='102', building='Main'))
+            db.session.commit()
+        self.assertEqual(cache_size(), 0)
+        third = json.loads(self.app.post('/api/generate-timetable', json=options).data)
+        self.assertFalse(third['cached'])
+        self.assertFalse(json.loads(self.app.post('/api/generate-timetable', json=dict(options, cache=False)).data)['cached'])
+        self.assertEqual(json.loads(self.app.delete('/api/generate-timetable/cache').data)['dropped'], 1)
+
+    def test_generate_timetable_warm_starts_from_stored_entries(self):
+        with app.app_context():
+            seed_small_institution()
+        self.app.post('/api/generate-timetable', json={'seed': 1, 'wait': True})
+        with app.app_context():
+            before = {(e.class_id, e.slot_id, e.faculty_id, e.location_id) for e in published_entries()}
+        for engine in ('backtracking', 'mrv', 'min_conflicts'):
+            data = json.loads(self.app.post('/api/generate-timetable', json={
+                'seed': 2, 'engine': engine, 'cache': False, 'wait': True
+            }).data)
+            self.assertEqual((data['entries_generated'], data['unchanged_entries']), (8, 8), engine)
+            with app.app_context():
+                after = {(e.class_id, e.slot_id, e.faculty_id, e.location_id) for e in published_entries()}
+            self.assertEqual(before, after, engine)
+
+    def test_failed_generation_keeps_previous_timetable(self):
+        with app.app_context():
+            seed_small_institution()
+        self.app.post('/api/generate-timetable', json={'wait': True})
+        with app.app_context():
+            before = sorted((e.class_id, e.slot_id, e.subject_id) for e in published_entries())
+        with patch.dict(SOLVERS, backtracking=lambda units, context: False):
+            data = json.loads(self.app.post('/api/generate-timetable', json={'cache': False, 'wait': True}).data)
+        self.assertEqual(data['entries_generated'], 0)
+        with app.app_context():
+            self.assertEqual(sorted((e.class_id, e.slot_id, e.subject_id) for e in published_entries()), before)
+            self.assertEqual(len(before), 8)
+
+    def test_generations_publish_rollback_and_collect(self):
+        with app.app_context():
+            seed_small_institution()
+        first = json.loads(self.app.post('/api/generate-timetable', json={'seed': 1, 'wait': True}).data)
+        candidate = json.loads(self.app.post('/api/generate-timetable', json={
+            'seed': 2, 'warm_start': False, 'cache': False, 'publish': False, 'wait': True
+        }).data)
+        self.assertEqual((first['published'], candidate['published']), (True, False))
+        with app.app_context():
+            self.assertEqual(published_generation_id(), first['generation_id'])
+            published = [placement(e) for e in published_entries()]
+
+        self.assertEqual(self.app.post(f"/api/timetable/generations/{candidate['generation_id']}/publish").status_code, 200)
+        generations = json.loads(self.app.get('/api/timetable/generations').data)
+        self.assertEqual([(g['generation_id'], g['published'], g['entry_count']) for g in generations],
+                         [(candidate['generation_id'], True, 8), (first['generation_id'], False, 8)])
+
+        # Rolling back is publishing the earlier generation again.
+        self.app.post(f"/api/timetable/generations/{first['generation_id']}/publish")
+        with app.app_context():
+            self.assertEqual([placement(e) for e in published_entries()], published)
+        self.assertEqual(self.app.delete(f"/api/timetable/generations/{first['generation_id']}").status_code, 409)
+        self.assertEqual(self.app.post('/api/timetable/generations/999/publish').status_code, 404)
+        self.assertEqual(json.loads(self.app.delete('/api/timetable/generations?keep=0').data)['dropped'], 1)
+        with app.app_context():
+            self.assertEqual(TimetableEntry.query.count(), 8)
+
+    def test_timetable_read_views(self):
+        self.assertEqual(self.app.get('/api/timetable/grid').status_code, 404)
+        with app.app_context():
+            seed_small_institution()
+            cls = Class.query.filter_by(class_name='CSE 1A').first()
+            alice = Faculty.query.filter_by(faculty_code='F1').first()
+            class_id, alice_id = cls.class_id, alice.faculty_id
+        self.app.post('/api/generate-timetable', json={'wait': True})
+
+        view = json.loads(self.app.get(f'/api/timetable/classes/{class_id}').data)
+        self.assertEqual(len(view['entries']), 4)
+        self.assertEqual({e['class_name'] for e in view['entries']}, {'CSE 1A'})
+        keys = [(e['day_of_week'] == 'Tuesday', e['period_number']) for e in view['entries']]
+        self.assertEqual(keys, sorted(keys))
+        faculty = json.loads(self.app.get(f'/api/timetable/faculties/{alice_id}').data)['entries']
+        self.assertTrue(faculty and all(e['faculty_name'] == 'Alice' for e in faculty))
+        monday = json.loads(self.app.get('/api/timetable/days/monday').data)['entries']
+        tuesday = json.loads(self.app.get('/api/timetable/days/Tuesday').data)['entries']
+        self.assertEqual(len(monday) + len(tuesday), 8)
+        self.assertEqual(self.app.get('/api/timetable/days/Funday').status_code, 400)
+
+        grid = json.loads(self.app.get('/api/timetable/grid').data)
+        self.assertEqual((grid['days'], grid['periods']), (['Monday', 'Tuesday'], [1, 2, 3]))
+        self.assertEqual(sum(len(p) for c in grid['classes'] for p in c['cells'].values()), 8)
+        csv_lines = self.app.get('/api/timetable/grid?format=csv').get_data(as_text=True).splitlines()
+        self.assertEqual((len(csv_lines), csv_lines[0].split(',')[0]), (9, 'entry_id'))
+
+    def test_entries_cannot_double_book_within_a_generation(self):
+        with app.app_context():
+            seed_small_institution()
+        self.app.post('/api/generate-timetable', json={'wait': True})
+        with app.app_context():
+            entry = published_entries()[0]
+            clash = TimetableEntry(generation_id=entry.generation_id, class_id=entry.class_id, slot_id=entry.slot_id,
+                                   subject_id=entry.subject_id, faculty_id=entry.faculty_id + 1000,
+                                   location_id=entry.location_id + 1000)
+            db.session.add(clash)
+            with self.assertRaises(IntegrityError):
+                db.session.commit()
+            db.session.rollback()
+
+    def test_validate_timetable_endpoint(self):
+        with app.app_context():
+            seed_small_institution()
+        self.app.post('/api/generate-timetable', json={'wait': True})
+        report = json.loads(self.app.get('/api/timetable/validate').data)
+        self.assertEqual((report['entries'], report['valid']), (8, True))
+
+        with app.app_context():
+            entries = [{k: getattr(e, k) for k in ('class_id', 'slot_id', 'subject_id', 'faculty_id', 'location_id')}
+                       for e in published_entries()]
+        # Put the second entry on top of the first, then drop one entry.
+        entries[1] = dict(entries[0])
+        entries.pop()
+        report = json.loads(self.app.post('/api/timetable/validate', json={'entries': entries}).data)
+        self.assertFalse(report['conflict_free'])
+        self.assertEqual({d['resource'] for d in report['double_booked']}, {'class', 'faculty', 'location'})
+        self.assertEqual(report['shortfalls'], 2)
+        self.assertEqual(self.app.post('/api/timetable/validate', json=[{'class_id': 'x'}]).status_code, 400)
+
+    def test_generate_timetable_optimizes_soft_score(self):
+        with app.app_context():
+            seed_small_institution()
+        plain = json.loads(self.app.post('/api/generate-timetable', json={'seed': 3, 'wait': True}).data)
+        self.assertIsNone(plain['soft_score']['optimization'])
+        data = json.loads(self.app.post('/api/generate-timetable', json={
+            'seed': 3, 'optimize': True, 'warm_start': False, 'wait': True
+        }).data)
+        optimization = data['soft_score']['optimization']
+        self.assertEqual(data['entries_generated'], 8)
+        self.assertLessEqual(optimization['after'], optimization['before'])
+        self.assertEqual(data['soft_score']['total'], optimization['after'])
+        self.assertIn('optimize', data['stats']['timings'])
+        with app.app_context():
+            self.assertNoDoubleBooking(published_entries())
+
+    def test_generate_timetable_profile(self):
+        with app.app_context():
+            seed_small_institution()
+        response = self.app.post('/api/generate-timetable', json={'profile': True, 'wait': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('_run_generation', json.loads(response.data)['profile'])
+
+    def test_generate_timetable_other_engines(self):
+        with app.app_context():
+            seed_small_institution()
+        for engine in ('mrv', 'min_conflicts'):
+            response = self.app.post('/api/generate-timetable', json={'engine': engine, 'wait': True})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)['entries_generated'], 8)
+            with app.app_context():
+                self.assertNoDoubleBooking(published_entries())
+
+    def test_generate_timetable_incremental(self):
+        with app.app_context():
+            seed_small_institution()
+        self.assertEqual(self.app.post('/api/generate-timetable', json={'wait': True}).status_code, 200)
+        with app.app_context():
+            before = {placement(e) for e in published_entries()}
+            maths = Subject.query.filter_by(code='MA101').first()
+            req = ClassSubject.query.filter_by(subject_id=maths.subject_id).first()
+            req.hours_per_week = 2
+            req_id = req.class_subject_id
+            db.session.commit()
+
+        data = json.loads(self.app.post('/api/generate-timetable', json={'incremental': True, 'wait': True}).data)
+        self.assertEqual((data['entries_kept'], data['entries_removed'], data['entries_generated']), (7, 1, 0))
+        with app.app_context():
+            after = {placement(e) for e in published_entries()}
+            self.assertEqual(len(before - after), 1)
+            self.assertTrue(after <= before)
+            db.session.get(ClassSubject, req_id).hours_per_week = 3
+            db.session.commit()
+
+        data = json.loads(self.app.post('/api/generate-timetable', json={'incremental': True, 'wait': True}).data)
+        self.assertEqual(data['entries_generated'], 1)
+        with app.app_context():
+            entries = published_entries()
+            self.assertEqual(len(entries), 8)
+            self.assertTrue(after <= {placement(e) for e in entries})
+            self.assertNoDoubleBooking(entries)
+
+    def test_generate_timetable_incremental_min_conflicts_works_around_kept_entries(self):
+        with app.app_context():
+            seed_small_institution()
+        self.assertEqual(self.app.post('/api/generate-timetable', json={'seed': 3, 'wait': True}).status_code, 200)
+        with app.app_context():
+            maths = Subject.query.filter_by(code='MA101').first()
+            req = ClassSubject.query.filter_by(subject_id=maths.subject_id).first()
+            req.hours_per_week = 2
+            req_id = req.class_subject_id
+            db.session.commit()
+        options = {'incremental': True, 'engine': 'min_conflicts', 'wait': True}
+        self.assertEqual(self.app.post('/api/generate-timetable', json=options).status_code, 200)
+        with app.app_context():
+            db.session.get(ClassSubject, req_id).hours_per_week = 3
+            db.session.commit()
+
+        for seed in range(4):
+            response = self.app.post('/api/generate-timetable', json=dict(options, seed=seed, publish=False))
+            self.assertEqual(response.status_code, 200, seed)
+            data = json.loads(response.data)
+            self.assertEqual(data['entries_generated'] + data['entries_kept'], 8)
+            with app.app_context():
+                entries = TimetableEntry.query.filter_by(generation_id=data['generation_id']).all()
+                self.assertEqual(len(entries), 8)
+                self.assertNoDoubleBooking(entries)
+
+    def test_incremental_failure_reports_cancellation(self):
+        with app.app_context():
+            seed_small_institution()
+        self.app.post('/api/generate-timetable', json={'wait': True})
+        with app.app_context():
+            db.session.delete(published_entries()[0])
+            db.session.commit()
+        attempts = []
+
+        def cancelled(units, context):
+            attempts.append(len(units))
+            context['cancelled'] = True
+            return False
+
+        with patch.dict(SOLVERS, backtracking=cancelled):
+            data = json.loads(self.app.post('/api/generate-timetable', json={'incremental': True, 'wait': True}).data)
+        self.assertEqual((data['entries_generated'], data['cancelled'], data['timed_out']), (0, True, False))
+        self.assertEqual(len(attempts), 1)
+
+    def test_incremental_output_is_validated_before_saving(self):
+        with app.app_context():
+            seed_small_institution()
+        self.app.post('/api/generate-timetable', json={'wait': True})
+        with app.app_context():
+            db.session.delete(published_entries()[0])
+            db.session.commit()
+            published = published_generation_id()
+
+        def clashing(units, context):
+            # Puts the missing unit on top of a kept entry.
+            context['results'].append(dict(context['results'][0], class_id=units[0]['class_id'],
+                                           subject_id=units[0]['subject_id']))
+            return True
+
+        with patch.dict(SOLVERS, backtracking=clashing):
+            response = self.app.post('/api/generate-timetable', json={'incremental': True, 'wait': True})
+        self.assertEqual(response.status_code, 500)
+        self.assertGreater(json.loads(response.data)['validation']['double_bookings'], 0)
+        with app.app_context():
+            self.assertEqual(published_generation_id(), published)
+            self.assertEqual(len(published_entries()), 7)
+
+    def test_generate_timetable_rejects_infeasible_input(self):
+        with app.app_context():
+            seed_small_institution()
+            lab = Subject.query.filter_by(code='CS101L').first()
+            db.session.add(Subject(code='PH101', name='Physics'))
+            for req in ClassSubject.query.filter_by(subject_id=lab.subject_id):
+                req.hours_per_week = 4
+            db.session.flush()
+            physics = Subject.query.filter_by(code='PH101').first()
+            cls = Class.query.first()
+            db.session.add(ClassSubject(class_id=cls.class_id, subject_id=physics.subject_id, hours_per_week=1))
+            db.session.commit()
+
+        response = self.app.post('/api/generate-timetable', json={'wait': True})
+        self.assertEqual(response.status_code, 422)
+        kinds = {p['kind'] for p in json.loads(response.data)['problems']}
+        # 8 lab periods for one lab and one lab teacher over 6 slots; nobody
+        # teaches Physics; one lecture room for 7 periods; the class with
+        # Physics needs 8 of 6 slots.
+        self.assertEqual(kinds, {
+            'lab_rooms', 'faculty_hours', 'subject_hours', 'unmapped_subject',
+            'lecture_rooms', 'class_hours'
+        })
+
+    def test_generate_timetable_portfolio(self):
+        with app.app_context():
+            seed_small_institution()
+        response = self.app.post('/api/generate-timetable', json={'portfolio': 2, 'seed': 7, 'wait': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['entries_generated'], 8)
+        with app.app_context():
+            self.assertNoDoubleBooking(published_entries())
+
+    def test_pool_timeout_is_not_reported_as_a_time_budget(self):
+        with app.app_context():
+            seed_small_institution()
+
+        def gave_up(units, context, engine, instances, timeout):
+            context['timed_out'] = True
+            return False
+
+        with patch('backend.scheduler.solve_portfolio', gave_up):
+            data = json.loads(self.app.post('/api/generate-timetable', json={'portfolio': 2, 'wait': True}).data)
+        self.assertTrue(data['timed_out'])
+        self.assertIn(f'{PORTFOLIO_TIMEOUT}s limit', data['message'])
+        self.assertNotIn('Time budget', data['message'])
+
+    def test_generate_timetable_decomposed(self):
+        with app.app_context():
+            seed_small_institution()
+        response = self.app.post('/api/generate-timetable', json={'decompose': True, 'wait': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['entries_generated'], 8)
+        with app.app_context():
+            self.assertNoDoubleBooking(published_entries())
+
+    def test_decomposed_warm_start_keeps_hints_in_each_components_rooms(self):
+        with app.app_context():
+            branch, section = Branch(name='ECE', code='ECE'), Section(name='A')
+            db.session.add_all([branch, section])
+            db.session.flush()
+            classes = [Class(branch_id=branch.branch_id, section_id=section.section_id, year=1, class_name=name)
+                       for name in ('ECE 1A', 'ECE 1B')]
+            subjects = [Subject(code='MA101', name='Maths'), Subject(code='PH101', name='Physics')]
+            for name, subject in zip(('Alice', 'Bob'), subjects):
+                teacher = Faculty(name=name)
+                teacher.subjects.append(subject)
+                db.session.add(teacher)
+            db.session.add_all(classes + subjects + [Location(room_no='101'), Location(room_no='102')])
+            for period in range(1, 5):
+                db.session.add(TimeSlot(day_of_week='Monday', period_number=period, start_time=dt.time(8 + period),
+                                        end_time=dt.time(9 + period), applicable_year_group='ALL'))
+            db.session.flush()
+            requirements = [ClassSubject(class_id=cls.class_id, subject_id=subject.subject_id, hours_per_week=2)
+                            for cls, subject in zip(classes, subjects)]
+            db.session.add_all(requirements)
+            db.session.commit()
+            req_id = requirements[0].class_subject_id
+        self.assertEqual(self.app.post('/api/generate-timetable', json={'seed': 1, 'wait': True}).status_code, 200)
+        with app.app_context():
+            db.session.get(ClassSubject, req_id).hours_per_week = 3
+            db.session.commit()
+
+        # Each class is its own component with one of the two rooms; hints
+        # pointing at the other component's room must not be placed.
+        for seed in range(6):
+            response = self.app.post('/api/generate-timetable', json={
+                'decompose': True, 'seed': seed, 'cache': False, 'publish': False, 'wait': True
+            })
+            self.assertEqual(response.status_code, 200, seed)
+            self.assertEqual(json.loads(response.data)['entries_generated'], 5)
+
+    def test_generate_timetable_rejects_bad_options(self):
+        for options in ({'seed': [1]}, {'seed': {'a': 1}}, {'portfolio': -3},
+                        {'portfolio': 10 ** 9}, {'portfolio': '2'}):
+            response = self.app.post('/api/generate-timetable', json=options)
+            self.assertEqual(response.status_code, 400, options)
+        for options in ({'time_budget': 0}, {'time_budget': 'soon'}, {'time_budget': 10 ** 6}):
+            response = self.app.post('/api/generate-timetable', json=options)
+            self.assertEqual(response.status_code, 400, options)
+            self.assertIn('error', json.loads(response.data))
+
+    def test_generate_timetable_unknown_engine(self):
+        response = self.app.post('/api/generate-timetable', json={'engine': 'quantum'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_synthetic_institution_is_feasible_and_repeatable(self):
+        with app.app_context():
+            summary = generate_institution('small', seed=3)
+            self.assertEqual(analyze_feasibility(fetch_scheduling_data_orm()), [])
+            mapping = sorted((f.faculty_code, s.code) for f in Faculty.query.all() for s in f.subjects)
+        response = self.app.post('/api/generate-timetable', json={'wait': True})
+        self.assertEqual(json.loads(response.data)['entries_generated'], summary['units'])
+
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            generate_institution('small', seed=3)
+            self.assertEqual(mapping, sorted((f.faculty_code, s.code) for f in Faculty.query.all() for s in f.subjects))
+
+    def test_mrv_solves_the_tight_synthetic_scale(self):
+        with app.app_context():
+            summary = generate_institution('tight', seed=0)
+        for seed in range(3):
+            data = json.loads(self.app.post('/api/generate-timetable', json={
+                'engine': 'mrv', 'seed': seed, 'time_budget': 30, 'cache': False, 'publish': False, 'wait': True
+            }).data)
+            self.assertEqual((data['entries_generated'], data['timed_out']), (summary['units'], False), seed)
+
+    def test_fetch_query_count_does_not_grow_with_data(self):
+        counts = []
+        with app.app_context():
+            for scale in ('small', 'medium'):
+                db.drop_all()
+                db.create_all()
+                summary = generate_institution(scale, seed=1)
+                data = fetch_scheduling_data_orm()
+                self.assertEqual(sum(h for reqs in data['class_subject_requirements'].values() for _, h, _ in reqs),
+                                 summary['units'])
+                counts.append(data['query_count'])
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[0], 7)
+
+def make_solver_context(n_slots, lecture_rooms, lab_rooms=0, subjects=None):
+    return {
+        'rng': random.Random(0),
+        'timeslots': [SlotInfo(i, 'ALL') for i in range(n_slots)],
+        'subject_faculty': dict(subjects or {}),
+        'lecture_rooms': list(range(lecture_rooms)),
+        'lab_rooms': [1000 + r for r in range(lab_rooms)],
+        'class_schedule': defaultdict(int),
+        'faculty_schedule': defaultdict(int),
+        'location_schedule': defaultdict(int),
+        'results': []
+    }
+
+class TestSolver(unittest.TestCase):
+    def test_backtracking_handles_thousands_of_units(self):
+        # 200 classes x 30 slots with one teacher each: 6000 units, far deeper
+        # than Python's recursion limit.
+        n_classes, n_slots = 200, 30
+        units = [
+            {'class_id': c, 'subject_id': c, 'is_lab': False, 'year': 2}
+            for c in range(n_classes) for _ in range(n_slots)
+        ]
+        context = make_solver_context(n_slots, n_classes, subjects={c: [c] for c in range(n_classes)})
+        self.assertTrue(solve_timetable_backtracking(units, context))
+        self.assertEqual(len(context['results']), len(units))
+        rooms = {(r['location_id'], r['slot_id']) for r in context['results']}
+        self.assertEqual(len(rooms), len(units))
+
+    def test_mrv_places_the_tightest_unit_first(self):
+        # Teacher 0 is the only one for subject 0 and also shares subject 1
+        # with teacher 1; both teachers are needed in every slot, so giving
+        # subject 1 to teacher 0 would starve subject 0.
+        units = (
+            [{'class_id': 1, 'subject_id': 1, 'is_lab': False, 'year': 1}] * 2
+            + [{'class_id': 2, 'subject_id': 0, 'is_lab': False, 'year': 1}] * 3
+            + [{'class_id': 3, 'subject_id': 2, 'is_lab': False, 'year': 1}]
+        )
+        context = make_solver_context(3, 3, subjects={0: [0], 1: [0, 1], 2: [1]})
+        self.assertTrue(solve_timetable_mrv(units, context))
+        self.assertEqual(len(context['results']), len(units))
+        for key in ('class_id', 'faculty_id', 'location_id'):
+            seen = [(r[key], r['slot_id']) for r in context['results']]
+            self.assertEqual(len(seen), len(set(seen)))
+
+    def test_portfolio_returns_first_complete_solution(self):
+        units = [
+            {'class_id': c, 'subject_id': c % 3, 'is_lab': False, 'year': 1}
+            for c in range(6) for _ in range(4)
+        ]
+        context = make_solver_context(8, 4, subjects={0: [0, 1], 1: [1, 2], 2: [2, 3]})
+        self.assertTrue(solve_portfolio(units, context, 'backtracking', instances=3))
+        self.assertEqual(len(context['results']), len(units))
+        for key in ('class_id', 'faculty_id', 'location_id'):
+            seen = [(r[key], r['slot_id']) for r in context['results']]
+            self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(popcount(context['class_schedule'][0]), 4)
+
+    def test_decomposition_splits_disjoint_staff(self):
+        # Classes 0-1 are taught by teacher 0, classes 2-3 by teacher 1.
+        units = [
+            {'class_id': c, 'subject_id': c // 2, 'is_lab': False, 'year': 1}
+            for c in range(4) for _ in range(3)
+        ]
+        context = make_solver_context(6, 4, subjects={0: [0], 1: [1]})
+        parts = decompose_assignments(units, context)
+        self.assertEqual(len(parts), 2)
+        self.assertEqual(sorted({u['class_id'] for u in parts[0][0]} | {u['class_id'] for u in parts[1][0]}), [0, 1, 2, 3])
+        self.assertFalse(set(parts[0][1]['lecture_rooms']) & set(parts[1][1]['lecture_rooms']))
+
+        self.assertTrue(solve_decomposed(units, context))
+        self.assertEqual(len(context['results']), len(units))
+        for key in ('class_id', 'faculty_id', 'location_id'):
+            seen = [(r[key], r['slot_id']) for r in context['results']]
+            self.assertEqual(len(seen), len(set(seen)))
+
+    def test_backtracking_stops_at_deadline_with_best_partial(self):
+        # 33 lectures for one teacher over 32 slots: the last unit can never be
+        # placed and the search would otherwise thrash for a very long time.
+        units = [
+            {'class_id': c, 'subject_id': 0, 'is_lab': False, 'year': 1}
+            for c in range(11) for _ in range(3)
+        ]
+        context = make_solver_context(32, 11, subjects={0: [0]})
+        context['deadline'] = time.monotonic() + 0.2
+        started = time.monotonic()
+        self.assertFalse(solve_timetable_backtracking(units, context))
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertTrue(context['timed_out'])
+        self.assertEqual(len(context['best_results']), 32)
+        unplaced = summarize_unplaced(units, context['best_results'])
+        self.assertEqual(sum(u['hours_missing'] for u in unplaced), 1)
+
+    def test_min_conflicts_repairs_to_a_clash_free_timetable(self):
+        # Every slot of both teachers is needed, so the greedy start clashes.
+        units = [
+            {'class_id': c, 'subject_id': c % 2, 'is_lab': False, 'year': 1}
+            for c in range(4) for _ in range(5)
+        ]
+        context = make_solver_context(10, 2, subjects={0: [0], 1: [1]})
+        self.assertTrue(solve_timetable_min_conflicts(units, context))
+        self.assertEqual(len(context['results']), len(units))
+        for key in ('class_id', 'faculty_id', 'location_id'):
+            seen = [(r[key], r['slot_id']) for r in context['results']]
+            self.assertEqual(len(seen), len(set(seen)))
+
+    def test_min_conflicts_keeps_clash_free_partial_on_failure(self):
+        units = [{'class_id': c, 'subject_id': 0, 'is_lab': False, 'year': 1} for c in range(5)]
+        context = make_solver_context(4, 5, subjects={0: [0]})
+        context['max_steps'] = 200
+        self.assertFalse(solve_timetable_min_conflicts(units, context))
+        self.assertEqual(len(context['best_results']), 4)
+
+    def test_mrv_detects_infeasible_input(self):
+        units = [{'class_id': 1, 'subject_id': 0, 'is_lab': True, 'year': 1}] * 2
+        context = make_solver_context(4, 2, lab_rooms=0, subjects={0: [0]})
+        self.assertFalse(solve_timetable_mrv(units, context))
+        self.assertEqual(context['results'], [])
+
+class TestObjective(unittest.TestCase):
+    def test_incremental_score_matches_full_rescore(self):
+        rng = random.Random(4)
+        slots = [SlotInfo(i, 'ALL', ('Mon', 'Tue')[i // 6], i % 6 + 1) for i in range(12)]
+        context = {'timeslots': slots, 'location_building': {0: 'A', 1: 'B', 2: None}}
+        entries = [{'class_id': rng.randrange(3), 'slot_id': rng.randrange(12), 'subject_id': rng.randrange(2),
+                    'faculty_id': f, 'location_id': rng.randrange(3)} for f in range(2) for _ in range(6)]
+        # One entry per faculty and slot, as the hard constraints guarantee.
+        entries = list({(e['faculty_id'], e['slot_id']): e for e in entries}.values())
+        state = new_objective(context)
+        for e in entries:
+            add_placement(state, e)
+        for e in entries[::2]:
+            remove_placement(state, e)
+            self.assertEqual(state['total'], score_timetable(context, [x for x in entries if x is not e])['total'])
+            add_placement(state, e)
+        self.assertEqual(state['total'], score_timetable(context, entries)['total'])
+
+    def test_gaps_overload_repeats_and_building_changes(self):
+        slots = [SlotInfo(i, 'ALL', 'Mon', i + 1) for i in range(7)]
+        context = {'timeslots': slots, 'location_building': {0: 'A', 1: 'B'}}
+        entries = [{'class_id': 1, 'slot_id': pos, 'subject_id': 5, 'faculty_id': 9, 'location_id': loc}
+                   for pos, loc in ((0, 0), (1, 1), (3, 1), (4, 1), (6, 0))]
+        terms = score_timetable(context, entries)['terms']
+        self.assertEqual(terms, {'faculty_gaps': 2, 'faculty_overload': 1, 'repeated_subject': 4,
+                                 'building_changes': 1})
+
+class TestEligibility(unittest.TestCase):
+    def test_index_compiles_year_group_masks(self):
+        slots = [SlotInfo(i, group) for i, group in enumerate(['ALL', '1', '2-3+', 'ALL'])]
+        index = build_eligibility_index(slots, {'year': {1, 3}})
+        self.assertEqual(index['year'], {1: 0b1011, 3: 0b1101})
+
+        context = {'timeslots': slots, 'eligibility': index}
+        self.assertEqual(eligible_slots(context, {'year': 2}), 0b1101)
+        self.assertIn(2, context['eligibility']['year'])
+        self.assertEqual(slot_positions(context, 0b1101), [0, 2, 3])
+
+class TestValidator(unittest.TestCase):
+    def test_reports_year_group_violations_and_unknown_ids(self):
+        reference = {
+            'timeslots': [(10, 'ALL'), (11, '1'), (12, '2-3+')],
+            'class_years': {1: 1, 2: 3},
+            'subjects': [7], 'faculty': [4, 5], 'locations': [9],
+            'requirements': {(1, 7): 1, (2, 7): 1}
+        }
+        entries = [
+            {'class_id': 1, 'slot_id': 12, 'subject_id': 7, 'faculty_id': 4, 'location_id': 9},
+            {'class_id': 2, 'slot_id': 11, 'subject_id': 7, 'faculty_id': 5, 'location_id': 9},
+            {'class_id': 2, 'slot_id': 99, 'subject_id': 7, 'faculty_id': 5, 'location_id': 9},
+        ]
+        report = validate_timetable(entries, reference)
+        self.assertEqual((report['year_group_violations'], report['unknown_references']), (2, 1))
+        self.assertEqual(report['unknown'][0]['slot_id'], 99)
+        self.assertEqual((report['double_bookings'], report['shortfalls'], report['complete']), (0, 0, True))
+        self.assertEqual(report['excess'], 1)
+
+class TestFeasibility(unittest.TestCase):
+    def test_senior_years_share_their_lab_slots(self):
+        # Years 2 and 3 may only use the two 'ALL' and two '2-3+' slots, so
+        # one lab cannot host their 6 lab periods even though each year alone fits.
+        groups = ['ALL', 'ALL', '1', '1', '2-3+', '2-3+']
+        data = {
+            'timeslots': [SimpleNamespace(slot_id=i, applicable_year_group=g) for i, g in enumerate(groups)],
+            'classes': [
+                SimpleNamespace(class_id=1, class_name='Y2', year=2),
+                SimpleNamespace(class_id=2, class_name='Y3', year=3),
+            ],
+            'subjects': {1: SimpleNamespace(code='L1', faculty_ids=(1,)),
+                         2: SimpleNamespace(code='L2', faculty_ids=(2,))},
+            'faculties': {},
+            'locations': [SimpleNamespace(location_id=1, is_lab=True)],
+            'class_subject_requirements': {1: [(1, 3, True)], 2: [(2, 3, True)]},
+        }
+        problems = analyze_feasibility(data)
+        self.assertEqual([(p['kind'], p['required'], p['available']) for p in problems],
+                         [('lab_rooms', 6, 4)])
 
 if __name__ == '__main__':
     unittest.main()